@@ -1,11 +1,17 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import anthropic
+from anthropic.types import Message, TextBlock
+from response_cache import ResponseCache
+from search_tools import ToolError
 
 
 class AIGenerator:
     """Handles interactions with Anthropic's Claude API for generating responses"""
 
+    MAX_ROUNDS = 2  # Maximum sequential tool calling rounds
+
     # Static system prompt to avoid rebuilding on each call
     SYSTEM_PROMPT = """ You are an AI assistant specialized in course materials and
 educational content with access to comprehensive tools for course information.
@@ -65,17 +71,38 @@ All responses must be:
 Provide only the direct answer to what was asked.
 """
 
-    def __init__(self, api_key: str, model: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    # Static system block with a prompt-cache breakpoint so repeated calls
+    # read the cached prefix instead of re-processing it every turn
+    SYSTEM_BLOCKS = [
+        {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}
+    ]
+
+    # Shared by every tool-enabled request; the SDK does not mutate it
+    TOOL_CHOICE_AUTO = {"type": "auto"}
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        response_cache: Optional[ResponseCache] = None,
+        client: Optional[anthropic.AsyncAnthropic] = None,
+    ):
+        if client is None:
+            # HTTP/2 lets concurrent requests share one pooled TLS connection to the API
+            client = anthropic.AsyncAnthropic(
+                api_key=api_key, http_client=anthropic.DefaultAsyncHttpxClient(http2=True)
+            )
+        self.client = client
         self.model = model
+        self.response_cache = response_cache
 
         # Pre-build base API parameters
         self.base_params = {"model": self.model, "temperature": 0, "max_tokens": 800}
 
-    def generate_response(
+    async def generate_response(
         self,
         query: str,
-        conversation_history: Optional[str] = None,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
         tools: Optional[List] = None,
         tool_manager=None,
     ) -> Dict[str, Any]:
@@ -85,7 +112,7 @@ Provide only the direct answer to what was asked.
 
         Args:
             query: The user's question or request
-            conversation_history: Previous messages for context
+            conversation_history: Prior user/assistant messages, oldest first
             tools: Available tools the AI can use
             tool_manager: Manager to execute tools
 
@@ -94,98 +121,261 @@ Provide only the direct answer to what was asked.
             {
                 "response": str,           # Final answer text
                 "rounds_used": int,        # Number of tool rounds executed
-                "tools_used": List[str]    # Tool names in order of execution
+                "tools_used": List[str],   # Tool names in order of execution
+                "sources": List[Dict],     # Sources of this call's tools, in tool_use order
+                "succeeded": bool          # Non-empty answer and no tool call failed
             }
         """
 
-        # Build system content efficiently - avoid string ops when possible
-        system_content = (
-            f"{self.SYSTEM_PROMPT}\n\nPrevious conversation:\n{conversation_history}"
-            if conversation_history
-            else self.SYSTEM_PROMPT
-        )
+        api_params, messages = self._build_request(query, conversation_history, tools)
 
         # Initialize tracking variables
-        messages = [{"role": "user", "content": query}]
         round_count = 0
-        MAX_ROUNDS = 2  # Maximum sequential tool calling rounds
         all_tools_used = []
+        all_sources = []
+        tools_succeeded = True
         latest_response = None
 
-        # Prepare base API parameters (preserved across rounds)
-        base_api_params = {**self.base_params, "system": system_content}
-
-        # Add tools if available (tools persist across all rounds)
-        if tools:
-            base_api_params["tools"] = tools
-            base_api_params["tool_choice"] = {"type": "auto"}
-
         # Multi-round tool calling loop
         while True:
-            # Make API call with current messages
-            api_params = {**base_api_params, "messages": messages}
-            latest_response = self.client.messages.create(**api_params)
+            # Make API call with current messages (the same params dict is reused
+            # across rounds; only its messages entry changes)
+            api_params["messages"] = messages
+            latest_response = await self._create_message(api_params)
 
             # TERMINATION CONDITION 1: Claude finished without tools
             if latest_response.stop_reason != "tool_use":
                 break
 
-            # TERMINATION CONDITION 2: No tool_use blocks (safety check)
-            tool_use_blocks = [
-                block for block in latest_response.content if block.type == "tool_use"
-            ]
-            if not tool_use_blocks:
-                break
-
-            # TERMINATION CONDITION 3: No tool manager provided
+            # TERMINATION CONDITION 2: No tool manager provided
             if not tool_manager:
                 break
 
             # Execute tools for this round
             try:
-                messages, tool_success, tool_names = self._execute_tools_for_round(
-                    latest_response, messages, tool_manager
+                messages, tool_success, tool_names, had_tool_use, sources = (
+                    await self._execute_tools_for_round(latest_response, messages, tool_manager)
                 )
                 all_tools_used.extend(tool_names)
+                all_sources.extend(sources)
+                tools_succeeded = tools_succeeded and tool_success
 
-                # TERMINATION CONDITION 4: Tool execution failed
-                if not tool_success:
+                # TERMINATION CONDITION 3: No tool_use blocks (safety check)
+                if not had_tool_use:
                     break
 
             except Exception as e:
                 # Log error and break loop to prevent infinite loops
                 print(f"Tool execution error in round {round_count}: {e}")
+                tools_succeeded = False
                 break
 
             # Increment round counter
             round_count += 1
 
-            # TERMINATION CONDITION 5: Max rounds reached
-            # After executing tools, check if we've hit max rounds
-            # If so, make one final call to get Claude's response
-            if round_count >= MAX_ROUNDS:
-                api_params = {**base_api_params, "messages": messages}
-                latest_response = self.client.messages.create(**api_params)
+            # TERMINATION CONDITION 4: Tool execution failed or max rounds reached
+            # Make one final call so Claude answers from the results it has,
+            # including any is_error results, rather than calling more tools
+            if not tool_success or round_count >= self.MAX_ROUNDS:
+                api_params["messages"] = messages
+                latest_response = await self._create_message(api_params)
                 break
 
         # Extract final response text
-        response_text = ""
-        if latest_response:
-            for block in latest_response.content:
-                if hasattr(block, "text"):
-                    response_text = block.text
-                    break
+        response_text = self._extract_text(latest_response) if latest_response else ""
 
         # Return response with metadata
         return {
             "response": response_text if response_text else "Error: No response generated",
             "rounds_used": round_count,
             "tools_used": all_tools_used,
+            "sources": all_sources,
+            "succeeded": bool(response_text) and tools_succeeded,
         }
 
-    def _execute_tools_for_round(
+    async def generate_response_stream(
+        self,
+        query: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream an AI response, yielding text as it is generated.
+        Tool rounds run the same way as in generate_response(); text is streamed
+        from every API call, so the final answer arrives token by token.
+
+        Args:
+            query: The user's question or request
+            conversation_history: Prior user/assistant messages, oldest first
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+
+        Yields:
+            {"type": "text", "text": str} for each text delta, then a single
+            {"type": "done", "response": str, "rounds_used": int, "tools_used": List[str],
+            "sources": List[Dict], "succeeded": bool}
+        """
+        api_params, messages = self._build_request(query, conversation_history, tools)
+
+        round_count = 0
+        all_tools_used = []
+        all_sources = []
+        tools_succeeded = True
+        # Set after a failed tool round: Claude gets one more call to answer from it
+        final_call = False
+
+        while True:
+            api_params["messages"] = messages
+
+            cache_key, latest_response = self._cache_lookup(api_params)
+            if latest_response:
+                yield {"type": "text", "text": self._extract_text(latest_response)}
+                break
+
+            async with self.client.messages.stream(**api_params) as stream:
+                async for text in stream.text_stream:
+                    yield {"type": "text", "text": text}
+                latest_response = await stream.get_final_message()
+            self._cache_store(cache_key, latest_response)
+
+            # Stop when Claude is done, when the round budget is spent, after the
+            # final call that follows a failed tool round, or when there is nothing
+            # (or no one) to execute tools with
+            if (
+                latest_response.stop_reason != "tool_use"
+                or round_count >= self.MAX_ROUNDS
+                or final_call
+            ):
+                break
+            if not tool_manager:
+                break
+
+            try:
+                messages, tool_success, tool_names, had_tool_use, sources = (
+                    await self._execute_tools_for_round(latest_response, messages, tool_manager)
+                )
+                all_tools_used.extend(tool_names)
+                all_sources.extend(sources)
+                if not had_tool_use:
+                    break
+                final_call = not tool_success
+                tools_succeeded = tools_succeeded and tool_success
+            except Exception as e:
+                print(f"Tool execution error in round {round_count}: {e}")
+                tools_succeeded = False
+                break
+
+            round_count += 1
+
+        response_text = self._extract_text(latest_response)
+        yield {
+            "type": "done",
+            "response": response_text if response_text else "Error: No response generated",
+            "rounds_used": round_count,
+            "tools_used": all_tools_used,
+            "sources": all_sources,
+            "succeeded": bool(response_text) and tools_succeeded,
+        }
+
+    def _build_request(
+        self,
+        query: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        tools: Optional[List],
+    ) -> tuple[Dict[str, Any], List[Dict]]:
+        """
+        Build the API parameters shared by every round and the initial message list.
+
+        Layout: static system -> tools -> prior turns -> new user message. Only the
+        tail grows between turns, so the cached prefix stays byte-stable.
+        """
+        messages = (
+            self._with_history_breakpoint(conversation_history) if conversation_history else []
+        )
+        messages.append({"role": "user", "content": query})
+
+        # Prepare base API parameters (preserved across rounds)
+        base_api_params = {**self.base_params, "system": self.SYSTEM_BLOCKS}
+
+        # Add tools if available (tools persist across all rounds)
+        if tools:
+            base_api_params["tools"] = self._with_cache_breakpoint(tools)
+            base_api_params["tool_choice"] = self.TOOL_CHOICE_AUTO
+
+        return base_api_params, messages
+
+    async def _create_message(self, api_params: Dict[str, Any]):
+        """Call the Messages API, serving final answers from the response cache when possible"""
+        cache_key, cached_response = self._cache_lookup(api_params)
+        if cached_response:
+            return cached_response
+
+        response = await self.client.messages.create(**api_params)
+        self._cache_store(cache_key, response)
+        return response
+
+    def _cache_lookup(self, api_params: Dict[str, Any]) -> tuple[Optional[str], Optional[Message]]:
+        """
+        Look up a request in the response cache.
+
+        Only deterministic (temperature 0) requests are cacheable.
+
+        Returns:
+            Tuple of (cache_key, cached_response); cache_key is None when the request
+            is not cacheable and cached_response is None on a miss
+        """
+        if not self.response_cache or api_params.get("temperature") != 0:
+            return None, None
+
+        cache_key = self.response_cache.build_key(api_params)
+        cached_text = self.response_cache.get(cache_key)
+        if cached_text is None:
+            return cache_key, None
+
+        return cache_key, Message.model_construct(
+            content=[TextBlock(type="text", text=cached_text)], stop_reason="end_turn"
+        )
+
+    def _cache_store(self, cache_key: Optional[str], response):
+        """Cache a response if it ended the turn; intermediate tool_use responses are skipped"""
+        if not cache_key or response.stop_reason != "end_turn":
+            return
+
+        response_text = self._extract_text(response)
+        if response_text:
+            self.response_cache.set(cache_key, response_text)
+
+    @staticmethod
+    def _extract_text(response) -> str:
+        """Return the text of the first text block in a response"""
+        return next((block.text for block in response.content if block.type == "text"), "")
+
+    @staticmethod
+    def _with_cache_breakpoint(tools: List[Dict]) -> List[Dict]:
+        """Return a copy of tools with a cache breakpoint on the last definition"""
+        return tools[:-1] + [{**tools[-1], "cache_control": {"type": "ephemeral"}}]
+
+    @staticmethod
+    def _with_history_breakpoint(history: List[Dict[str, str]]) -> List[Dict]:
+        """Return a copy of history with a cache breakpoint on the newest prior turn"""
+        last = history[-1]
+        return history[:-1] + [
+            {
+                "role": last["role"],
+                "content": [
+                    {
+                        "type": "text",
+                        "text": last["content"],
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                ],
+            }
+        ]
+
+    async def _execute_tools_for_round(
         self, response, messages: List[Dict], tool_manager
-    ) -> tuple[List[Dict], bool, List[str]]:
+    ) -> tuple[List[Dict], bool, List[str], bool, List[Dict]]:
         """
         Execute all tool calls from Claude's response and update message history.
 
@@ -195,97 +385,79 @@ Provide only the direct answer to what was asked.
             tool_manager: Manager to execute tools
 
         Returns:
-            Tuple of (updated_messages, success_flag, tool_names)
+            Tuple of (updated_messages, success_flag, tool_names, had_tool_use, sources)
             - updated_messages: Messages list with assistant response and tool results added
             - success_flag: True if all tools executed successfully, False otherwise
             - tool_names: List of tool names that were executed
+            - had_tool_use: True if the response contained any tool_use blocks
+            - sources: Sources returned by each tool call, concatenated in tool_use order
         """
-        # Append assistant's tool use response to messages
-        messages.append({"role": "assistant", "content": response.content})
+        # Append assistant's tool use response to messages, dumped to plain dicts once
+        # so later rounds (and cache keys) serialize primitives instead of SDK models
+        messages.append(
+            {
+                "role": "assistant",
+                "content": [block.model_dump(exclude_none=True) for block in response.content],
+            }
+        )
 
-        # Execute all tool_use blocks and collect results
-        tool_results = []
-        all_succeeded = True
+        # Collect tool_use blocks in a single pass over the response content
         tool_names = []
-
-        for content_block in response.content:
-            if content_block.type == "tool_use":
-                tool_names.append(content_block.name)
-                try:
-                    # Execute the tool
-                    tool_result = tool_manager.execute_tool(
-                        content_block.name, **content_block.input
-                    )
-
-                    # Check if tool returned an error message
-                    if tool_result and isinstance(tool_result, str) and "Error" in tool_result:
-                        all_succeeded = False
-
-                    # Add result to collection
-                    tool_results.append(
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": content_block.id,
-                            "content": tool_result,
-                        }
-                    )
-
-                except Exception as e:
-                    # Tool execution failed - record error
-                    all_succeeded = False
-                    tool_results.append(
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": content_block.id,
-                            "content": f"Error executing tool: {str(e)}",
-                            "is_error": True,
-                        }
-                    )
+        pending = []
+        for block in response.content:
+            if block.type == "tool_use":
+                tool_names.append(block.name)
+                pending.append(self._run_tool(block, tool_manager))
+
+        # Execute all tool_use blocks concurrently; gather preserves order so
+        # tool_result order matches the assistant's tool_use order
+        outcomes = await asyncio.gather(*pending)
+        tool_results = [result for result, _, _ in outcomes]
+        all_succeeded = all(succeeded for _, succeeded, _ in outcomes)
+        # Each call returns its own sources, so none depend on which thread finished last
+        sources = [source for _, _, call_sources in outcomes for source in call_sources]
 
         # Append tool results as user message
         if tool_results:
             messages.append({"role": "user", "content": tool_results})
 
-        return messages, all_succeeded, tool_names
+        return messages, all_succeeded, tool_names, bool(pending), sources
 
-    def _handle_tool_execution(self, initial_response, base_params: Dict[str, Any], tool_manager):
+    @staticmethod
+    async def _run_tool(content_block, tool_manager) -> tuple[Dict[str, Any], bool, List[Dict]]:
         """
-        DEPRECATED: This method is kept for backward compatibility only.
-        Use the new multi-round tool calling loop in generate_response() instead.
-
-        Handle execution of tool calls and get follow-up response.
+        Execute a single tool_use block in a worker thread (tools do blocking ChromaDB IO).
 
-        Args:
-            initial_response: The response containing tool use requests
-            base_params: Base API parameters
-            tool_manager: Manager to execute tools
+        Tools signal failure by raising; the error is passed back to Claude as an
+        is_error tool_result so the result text itself is never inspected.
 
         Returns:
-            Final response text after tool execution
+            Tuple of (tool_result block, success_flag, sources of this call)
         """
-        # Start with existing messages
-        messages = base_params["messages"].copy()
-
-        # Add AI's tool use response
-        messages.append({"role": "assistant", "content": initial_response.content})
-
-        # Execute all tool calls and collect results
-        tool_results = []
-        for content_block in initial_response.content:
-            if content_block.type == "tool_use":
-                tool_result = tool_manager.execute_tool(content_block.name, **content_block.input)
-
-                tool_results.append(
-                    {"type": "tool_result", "tool_use_id": content_block.id, "content": tool_result}
-                )
-
-        # Add tool results as single message
-        if tool_results:
-            messages.append({"role": "user", "content": tool_results})
-
-        # Prepare final API call without tools
-        final_params = {**self.base_params, "messages": messages, "system": base_params["system"]}
-
-        # Get final response
-        final_response = self.client.messages.create(**final_params)
-        return final_response.content[0].text
+        try:
+            tool_result, sources = await asyncio.to_thread(
+                tool_manager.execute_tool_with_sources, content_block.name, **content_block.input
+            )
+        except ToolError as e:
+            # Tool reported a failure - pass its message through
+            error_message = str(e)
+        except Exception as e:
+            # Tool execution failed unexpectedly - record error
+            error_message = f"Error executing tool: {str(e)}"
+        else:
+            return (
+                {"type": "tool_result", "tool_use_id": content_block.id, "content": tool_result},
+                True,
+                sources,
+            )
+
+        return (
+            {
+                "type": "tool_result",
+                "tool_use_id": content_block.id,
+                "content": error_message,
+                "is_error": True,
+            },
+            False,
+            [],
+        )
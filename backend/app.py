@@ -1,20 +1,89 @@
+import asyncio
+import os
 import warnings
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+import orjson
+from config import config
+from fastapi import Depends, FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel, ConfigDict
+from rag_system import RAGSystem
+from starlette.datastructures import MutableHeaders
+
+# Silence the leaked-semaphore notice from multiprocessing's resource tracker only;
+# matching on module keeps every other warning untouched
+warnings.filterwarnings("ignore", category=UserWarning, module="multiprocessing.resource_tracker")
+
+# Cache headers for frontend files. Only JS and CSS requested with a ?v= version
+# query (as index.html references them) are cached for good; everything else,
+# including HTML, unversioned files and FastAPI's /docs, /redoc and /openapi.json,
+# is revalidated. Any change to a CSS or JS file must bump its ?v= in index.html.
+DEV_CACHE_HEADERS = {
+    "Cache-Control": "no-cache, no-store, must-revalidate",
+    "Pragma": "no-cache",
+    "Expires": "0",
+}
+REVALIDATE_CACHE_HEADERS = {"Cache-Control": "no-cache"}
+ASSET_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+VERSIONED_ASSET_SUFFIXES = (".js", ".css")
+
+# Body of every unhandled-error 500 outside dev mode, encoded once
+INTERNAL_ERROR_BODY = orjson.dumps({"detail": "Internal server error"})
+# Error frame sent when a stream fails outside dev mode, encoded once
+INTERNAL_ERROR_FRAME = (
+    b"data: " + orjson.dumps({"type": "error", "detail": "Internal server error"}) + b"\n\n"
+)
+
+
+class StaticCacheMiddleware:
+    """ASGI middleware that sets cache headers on frontend files; API routes pass through"""
+
+    def __init__(self, app, dev_mode: bool = False):
+        self.app = app
+        self.dev_mode = dev_mode
 
-warnings.filterwarnings("ignore", message="resource_tracker: There appear to be.*")
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path.startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
 
-import os  # noqa: E402
-from typing import List, Optional  # noqa: E402
+        if self.dev_mode:
+            cache_headers = DEV_CACHE_HEADERS
+        elif path.endswith(VERSIONED_ASSET_SUFFIXES) and self._is_versioned(scope):
+            cache_headers = ASSET_CACHE_HEADERS
+        else:
+            cache_headers = REVALIDATE_CACHE_HEADERS
+
+        async def send_with_cache_headers(message):
+            # Only cache successful file responses, never 404s
+            if message["type"] == "http.response.start" and message["status"] in (200, 304):
+                headers = MutableHeaders(scope=message)
+                for name, value in cache_headers.items():
+                    headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_headers)
+
+    @staticmethod
+    def _is_versioned(scope) -> bool:
+        """Return whether the request carries a ?v= version query"""
+        return "v" in parse_qs(scope.get("query_string", b"").decode("latin-1"))
 
-from config import config  # noqa: E402
-from fastapi import FastAPI, HTTPException  # noqa: E402
-from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
-from fastapi.middleware.trustedhost import TrustedHostMiddleware  # noqa: E402
-from fastapi.staticfiles import StaticFiles  # noqa: E402
-from pydantic import BaseModel  # noqa: E402
-from rag_system import RAGSystem  # noqa: E402
 
 # Initialize FastAPI app
-app = FastAPI(title="Course Materials RAG System", root_path="")
+# orjson encodes response bodies in C instead of the stdlib json module
+app = FastAPI(
+    title="Course Materials RAG System", root_path="", default_response_class=ORJSONResponse
+)
+
+# Cache headers for the frontend (no-cache everywhere when ENV=dev)
+app.add_middleware(StaticCacheMiddleware, dev_mode=config.DEV_MODE)
 
 # Add trusted host middleware for proxy
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
@@ -29,10 +98,24 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    """Report errors raised by the endpoints as a 500; the message is only exposed when ENV=dev"""
+    if config.DEV_MODE:
+        return ORJSONResponse(status_code=500, content={"detail": str(exc)})
+    return Response(content=INTERNAL_ERROR_BODY, status_code=500, media_type="application/json")
+
+
 # Initialize RAG system
 rag_system = RAGSystem(config)
 
 
+def get_rag_system() -> RAGSystem:
+    """Dependency that provides the RAG system; override it to serve a different one"""
+    return rag_system
+
+
 # Pydantic models for request/response
 class QueryRequest(BaseModel):
     """Request model for course queries"""
@@ -44,6 +127,8 @@ class QueryRequest(BaseModel):
 class SourceItem(BaseModel):
     """Model for a source citation with optional link"""
 
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     text: str
     link: Optional[str] = None
 
@@ -51,6 +136,8 @@ class SourceItem(BaseModel):
 class QueryResponse(BaseModel):
     """Response model for course queries"""
 
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     answer: str
     sources: List[SourceItem]
     session_id: str
@@ -59,55 +146,90 @@ class QueryResponse(BaseModel):
 class CourseStats(BaseModel):
     """Response model for course statistics"""
 
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     total_courses: int
     course_titles: List[str]
 
 
+def to_source_items(sources: List[Dict]) -> List[SourceItem]:
+    """
+    Convert source dicts ({"text": ..., "link": ...}) to SourceItem objects.
+
+    model_validate takes the dict as-is in pydantic-core; on pydantic v2 this is
+    faster than model_construct, which fills fields in Python.
+    """
+    return [SourceItem.model_validate(src) for src in sources]
+
+
 # API Endpoints
+# response_model stays on the JSON endpoints for the OpenAPI schema only. They return
+# an ORJSONResponse directly, so FastAPI skips its own validate-and-serialize pass
+# over a model the handler has just built.
 
 
 @app.post("/api/query", response_model=QueryResponse)
-async def query_documents(request: QueryRequest):
+async def query_documents(request: QueryRequest, rag: RAGSystem = Depends(get_rag_system)):
     """Process a query and return response with sources"""
-    try:
-        # Create session if not provided
-        session_id = request.session_id
-        if not session_id:
-            session_id = rag_system.session_manager.create_session()
+    # Create session if not provided
+    session_id = request.session_id
+    if not session_id:
+        session_id = rag.session_manager.create_session()
+
+    # Process query using RAG system
+    answer, sources = await rag.query(request.query, session_id)
+
+    response = QueryResponse(answer=answer, sources=to_source_items(sources), session_id=session_id)
+    return ORJSONResponse(response.model_dump())
 
-        # Process query using RAG system
-        answer, sources = rag_system.query(request.query, session_id)
 
-        # Convert dict sources to SourceItem objects
-        source_items = [
-            SourceItem(**src) if isinstance(src, dict) else SourceItem(text=src) for src in sources
-        ]
+@app.post("/api/query/stream")
+async def query_documents_stream(request: QueryRequest, rag: RAGSystem = Depends(get_rag_system)):
+    """Process a query and stream the answer as Server-Sent Events"""
+    # Create session if not provided
+    session_id = request.session_id or rag.session_manager.create_session()
 
-        return QueryResponse(answer=answer, sources=source_items, session_id=session_id)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Frames: "text" deltas as the answer is generated, then one "done" frame with
+    # the full answer, sources and session_id (or an "error" frame on failure)
+    async def event_stream():
+        try:
+            async for event in rag.query_stream(request.query, session_id):
+                if event["type"] == "done":
+                    event = {
+                        "type": "done",
+                        "answer": event["answer"],
+                        "sources": [
+                            item.model_dump() for item in to_source_items(event["sources"])
+                        ],
+                        "session_id": session_id,
+                    }
+                yield b"data: " + orjson.dumps(event) + b"\n\n"
+        except Exception as e:
+            # As in unhandled_exception_handler, the message is only exposed in dev mode
+            if config.DEV_MODE:
+                yield b"data: " + orjson.dumps({"type": "error", "detail": str(e)}) + b"\n\n"
+            else:
+                yield INTERNAL_ERROR_FRAME
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
 @app.get("/api/courses", response_model=CourseStats)
-async def get_course_stats():
+async def get_course_stats(rag: RAGSystem = Depends(get_rag_system)):
     """Get course analytics and statistics"""
-    try:
-        analytics = rag_system.get_course_analytics()
-        return CourseStats(
-            total_courses=analytics["total_courses"], course_titles=analytics["course_titles"]
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Catalog lookups hit ChromaDB synchronously; keep them off the event loop
+    analytics = await asyncio.to_thread(rag.get_course_analytics)
+    stats = CourseStats(
+        total_courses=analytics["total_courses"], course_titles=analytics["course_titles"]
+    )
+    return ORJSONResponse(stats.model_dump())
 
 
 @app.delete("/api/session/{session_id}")
-async def delete_session(session_id: str):
+async def delete_session(session_id: str, rag: RAGSystem = Depends(get_rag_system)):
     """Delete a conversation session and clear its history"""
-    try:
-        rag_system.session_manager.clear_session(session_id)
-        return {"status": "success", "message": f"Session {session_id} deleted"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    rag.session_manager.clear_session(session_id)
+    return {"status": "success", "message": f"Session {session_id} deleted"}
 
 
 @app.on_event("startup")
@@ -123,19 +245,5 @@ async def startup_event():
             print(f"Error loading documents: {e}")
 
 
-from fastapi.responses import FileResponse  # noqa: E402
-
-
-class DevStaticFiles(StaticFiles):
-    async def get_response(self, path: str, scope):
-        response = await super().get_response(path, scope)
-        if isinstance(response, FileResponse):
-            # Add no-cache headers for development
-            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
-        return response
-
-
 # Serve static files for the frontend
 app.mount("/", StaticFiles(directory="../frontend", html=True), name="static")
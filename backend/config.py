@@ -17,6 +17,9 @@ class Config:
 
     # Embedding model settings
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    # "sentence-transformers" (PyTorch) or "onnx" (ONNX Runtime, all-MiniLM-L6-v2 only).
+    # Chroma records the embedding function per collection, so switching needs a fresh CHROMA_PATH
+    EMBEDDING_BACKEND: str = "sentence-transformers"
 
     # Document processing settings
     CHUNK_SIZE: int = 800  # Size of text chunks for vector storage
@@ -25,8 +28,20 @@ class Config:
     MAX_HISTORY: int = 2  # Number of conversation messages to remember
     MAX_TOOL_ROUNDS: int = 2  # Maximum sequential tool calling rounds per query
 
+    # Semantic answer cache: repeats of a question (cosine similarity of the query
+    # embeddings at or above the threshold) skip the AI call; 0 entries disables it
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_SIZE: int = 1024
+    SEMANTIC_CACHE_TTL: float = 300.0  # Seconds an answer stays cached
+
     # Database paths
-    CHROMA_PATH: str = "./chroma_db"  # ChromaDB storage location
+    CHROMA_PATH: str = "./chroma_db"  # ChromaDB storage location (":memory:" keeps it in RAM)
+    RESPONSE_CACHE_PATH: str = "./response_cache.db"  # SQLite cache of final LLM answers
+    EMBEDDING_CACHE_PATH: str = "./embedding_cache.db"  # SQLite cache of document embeddings
+
+    # Server settings
+    # Disable browser caching of frontend files and return error messages in API 500s
+    DEV_MODE: bool = os.getenv("ENV") == "dev"
 
 
 config = Config()
@@ -4,6 +4,21 @@ from typing import List, Tuple
 
 from models import Course, CourseChunk, Lesson
 
+# Header patterns, compiled once; matched against stripped lines
+COURSE_TITLE = re.compile(r"^Course Title:\s*(.+)$", re.IGNORECASE)
+COURSE_LINK = re.compile(r"^Course Link:\s*(.+)$", re.IGNORECASE)
+COURSE_INSTRUCTOR = re.compile(r"^Course Instructor:\s*(.+)$", re.IGNORECASE)
+LESSON_LINK = re.compile(r"^Lesson Link:\s*(.+)$", re.IGNORECASE)
+# A whole "Lesson N: Title" line, found across the document body at once. [^\S\n] is
+# whitespace within the line; the title must not be blank, as with a stripped line
+LESSON_MARKER = re.compile(
+    r"^[^\S\n]*Lesson[^\S\n]+(\d+):[^\S\n]*(\S[^\n]*)$", re.IGNORECASE | re.MULTILINE
+)
+
+# Periods followed by whitespace and capital letters, ignoring common abbreviations
+SENTENCE_ENDINGS = re.compile(r"(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\!|\?)\s+(?=[A-Z])")
+WHITESPACE = re.compile(r"\s+")
+
 
 class DocumentProcessor:
     """Processes course documents and extracts structured information"""
@@ -26,13 +41,10 @@ class DocumentProcessor:
         """Split text into sentence-based chunks with overlap using config settings"""
 
         # Clean up the text
-        text = re.sub(r"\s+", " ", text.strip())  # Normalize whitespace
+        text = WHITESPACE.sub(" ", text.strip())  # Normalize whitespace
 
         # Better sentence splitting that handles abbreviations
-        # This regex looks for periods followed by whitespace and capital letters
-        # but ignores common abbreviations
-        sentence_endings = re.compile(r"(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\!|\?)\s+(?=[A-Z])")
-        sentences = sentence_endings.split(text)
+        sentences = SENTENCE_ENDINGS.split(text)
 
         # Clean sentences
         sentences = [s.strip() for s in sentences if s.strip()]
@@ -112,7 +124,7 @@ class DocumentProcessor:
 
         # Parse course title from first line
         if len(lines) >= 1 and lines[0].strip():
-            title_match = re.match(r"^Course Title:\s*(.+)$", lines[0].strip(), re.IGNORECASE)
+            title_match = COURSE_TITLE.match(lines[0].strip())
             if title_match:
                 course_title = title_match.group(1).strip()
             else:
@@ -125,13 +137,13 @@ class DocumentProcessor:
                 continue
 
             # Try to match course link
-            link_match = re.match(r"^Course Link:\s*(.+)$", line, re.IGNORECASE)
+            link_match = COURSE_LINK.match(line)
             if link_match:
                 course_link = link_match.group(1).strip()
                 continue
 
             # Try to match instructor
-            instructor_match = re.match(r"^Course Instructor:\s*(.+)$", line, re.IGNORECASE)
+            instructor_match = COURSE_INSTRUCTOR.match(line)
             if instructor_match:
                 instructor_name = instructor_match.group(1).strip()
                 continue
@@ -145,10 +157,6 @@ class DocumentProcessor:
 
         # Process lessons and create chunks
         course_chunks = []
-        current_lesson = None
-        lesson_title = None
-        lesson_link = None
-        lesson_content = []
         chunk_counter = 0
 
         # Start processing from line 4 (after metadata)
@@ -156,89 +164,55 @@ class DocumentProcessor:
         if len(lines) > 3 and not lines[3].strip():
             start_index = 4  # Skip empty line after instructor
 
-        i = start_index
-        while i < len(lines):
-            line = lines[i]
-
-            # Check for lesson markers (e.g., "Lesson 0: Introduction")
-            lesson_match = re.match(r"^Lesson\s+(\d+):\s*(.+)$", line.strip(), re.IGNORECASE)
-
-            if lesson_match:
-                # Process previous lesson if it exists
-                if current_lesson is not None and lesson_content:
-                    lesson_text = "\n".join(lesson_content).strip()
-                    if lesson_text:
-                        # Add lesson to course
-                        lesson = Lesson(
-                            lesson_number=current_lesson,
-                            title=lesson_title,
-                            lesson_link=lesson_link,
-                        )
-                        course.lessons.append(lesson)
-
-                        # Create chunks for this lesson
-                        chunks = self.chunk_text(lesson_text)
-                        for idx, chunk in enumerate(chunks):
-                            # For the first chunk of each lesson, add lesson context
-                            if idx == 0:
-                                chunk_with_context = f"Lesson {current_lesson} content: {chunk}"
-                            else:
-                                chunk_with_context = chunk
-
-                            course_chunk = CourseChunk(
-                                content=chunk_with_context,
-                                course_title=course.title,
-                                lesson_number=current_lesson,
-                                chunk_index=chunk_counter,
-                            )
-                            course_chunks.append(course_chunk)
-                            chunk_counter += 1
-
-                # Start new lesson
-                current_lesson = int(lesson_match.group(1))
-                lesson_title = lesson_match.group(2).strip()
-                lesson_link = None
-
-                # Check if next line is a lesson link
-                if i + 1 < len(lines):
-                    next_line = lines[i + 1].strip()
-                    link_match = re.match(r"^Lesson Link:\s*(.+)$", next_line, re.IGNORECASE)
-                    if link_match:
-                        lesson_link = link_match.group(1).strip()
-                        i += 1  # Skip the link line so it's not added to content
-
-                lesson_content = []
-            else:
-                # Add line to current lesson content
-                lesson_content.append(line)
-
-            i += 1
-
-        # Process the last lesson
-        if current_lesson is not None and lesson_content:
-            lesson_text = "\n".join(lesson_content).strip()
-            if lesson_text:
-                lesson = Lesson(
-                    lesson_number=current_lesson, title=lesson_title, lesson_link=lesson_link
-                )
-                course.lessons.append(lesson)
+        # Find every lesson marker (e.g., "Lesson 0: Introduction") in one pass over the body;
+        # each lesson's content runs until the next marker
+        body = "\n".join(lines[start_index:])
+        markers = list(LESSON_MARKER.finditer(body))
+        for marker_index, marker in enumerate(markers):
+            is_last = marker_index == len(markers) - 1
+            end = len(body) if is_last else markers[marker_index + 1].start()
+            lesson_lines = body[marker.end() : end].split("\n")[1:]
+
+            lesson_number = int(marker.group(1))
+            lesson_title = marker.group(2).strip()
+            lesson_link = None
+
+            # Check if next line is a lesson link, so it's not added to content
+            if lesson_lines:
+                link_match = LESSON_LINK.match(lesson_lines[0].strip())
+                if link_match:
+                    lesson_link = link_match.group(1).strip()
+                    lesson_lines = lesson_lines[1:]
+
+            lesson_text = "\n".join(lesson_lines).strip()
+            if not lesson_text:
+                continue
 
-                chunks = self.chunk_text(lesson_text)
-                for idx, chunk in enumerate(chunks):
-                    # For any chunk of each lesson, add lesson context & course title
+            course.lessons.append(
+                Lesson(lesson_number=lesson_number, title=lesson_title, lesson_link=lesson_link)
+            )
 
+            chunks = self.chunk_text(lesson_text)
+            for idx, chunk in enumerate(chunks):
+                if is_last:
+                    # For any chunk of the last lesson, add lesson context & course title
                     chunk_with_context = (
-                        f"Course {course_title} Lesson {current_lesson} content: {chunk}"
+                        f"Course {course_title} Lesson {lesson_number} content: {chunk}"
                     )
+                elif idx == 0:
+                    # For the first chunk of each other lesson, add lesson context
+                    chunk_with_context = f"Lesson {lesson_number} content: {chunk}"
+                else:
+                    chunk_with_context = chunk
 
-                    course_chunk = CourseChunk(
-                        content=chunk_with_context,
-                        course_title=course.title,
-                        lesson_number=current_lesson,
-                        chunk_index=chunk_counter,
-                    )
-                    course_chunks.append(course_chunk)
-                    chunk_counter += 1
+                course_chunk = CourseChunk(
+                    content=chunk_with_context,
+                    course_title=course.title,
+                    lesson_number=lesson_number,
+                    chunk_index=chunk_counter,
+                )
+                course_chunks.append(course_chunk)
+                chunk_counter += 1
 
         # If no lessons found, treat entire content as one document
         if not course_chunks and len(lines) > 2:
@@ -0,0 +1,63 @@
+import hashlib
+import sqlite3
+import threading
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """Cache of document embeddings keyed by model and content hash, backed by SQLite"""
+
+    def __init__(self, db_path: str):
+        # The connection is shared by the event loop and worker threads
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, embedding BLOB NOT NULL)"
+            )
+            self.conn.commit()
+
+    @staticmethod
+    def build_key(model_name: str, text: str) -> str:
+        """Build a cache key from the model name and the exact text embedded"""
+        return hashlib.sha256(f"{model_name}|{text}".encode()).hexdigest()
+
+    def embed(
+        self, texts: List[str], model_name: str, embed_fn: Callable[[List[str]], List]
+    ) -> List[np.ndarray]:
+        """Return embeddings for texts, calling embed_fn once for only the ones not cached"""
+        keys = [self.build_key(model_name, text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        with self.lock:
+            # Look up in slices to stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, embedding FROM embeddings "
+                    f"WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                found.update((key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            vectors = embed_fn(list(missing.values()))
+            new = {key: np.asarray(v, dtype=np.float32) for key, v in zip(missing, vectors)}
+            with self.lock:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, embedding) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in new.items()],
+                )
+                self.conn.commit()
+            found.update(new)
+
+        return [found[key] for key in keys]
+
+    def clear(self):
+        """Remove all cached embeddings"""
+        with self.lock:
+            self.conn.execute("DELETE FROM embeddings")
+            self.conn.commit()
@@ -1,10 +1,14 @@
+import asyncio
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from ai_generator import AIGenerator
 from document_processor import DocumentProcessor
-from models import Course
+from embedding_cache import EmbeddingCache
+from models import Course, CourseChunk
+from response_cache import ResponseCache
 from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
+from semantic_cache import SemanticCache
 from session_manager import SessionManager
 from vector_store import VectorStore
 
@@ -18,10 +22,26 @@ class RAGSystem:
         # Initialize core components
         self.document_processor = DocumentProcessor(config.CHUNK_SIZE, config.CHUNK_OVERLAP)
         self.vector_store = VectorStore(
-            config.CHROMA_PATH, config.EMBEDDING_MODEL, config.MAX_RESULTS
+            config.CHROMA_PATH,
+            config.EMBEDDING_MODEL,
+            config.MAX_RESULTS,
+            embedding_cache=EmbeddingCache(config.EMBEDDING_CACHE_PATH),
+            embedding_backend=config.EMBEDDING_BACKEND,
+        )
+        self.response_cache = ResponseCache(config.RESPONSE_CACHE_PATH)
+        self.ai_generator = AIGenerator(
+            config.ANTHROPIC_API_KEY, config.ANTHROPIC_MODEL, response_cache=self.response_cache
         )
-        self.ai_generator = AIGenerator(config.ANTHROPIC_API_KEY, config.ANTHROPIC_MODEL)
         self.session_manager = SessionManager(config.MAX_HISTORY)
+        self.semantic_cache = (
+            SemanticCache(
+                config.SEMANTIC_CACHE_THRESHOLD,
+                config.SEMANTIC_CACHE_SIZE,
+                config.SEMANTIC_CACHE_TTL,
+            )
+            if config.SEMANTIC_CACHE_SIZE > 0
+            else None
+        )
 
         # Initialize search tools
         self.tool_manager = ToolManager()
@@ -30,6 +50,13 @@ class RAGSystem:
         self.tool_manager.register_tool(self.search_tool)
         self.tool_manager.register_tool(self.outline_tool)
 
+        # Course analytics are cached until the catalog changes; every write to the
+        # vector store bumps the version so stale entries are never served
+        self._catalog_version = 0
+        self._analytics_cache: Optional[Tuple[int, Dict]] = None
+        # Catalog version the semantic cache's answers were produced against
+        self._semantic_cache_version = 0
+
     def add_course_document(self, file_path: str) -> Tuple[Course, int]:
         """
         Add a single course document to the knowledge base.
@@ -49,6 +76,7 @@ class RAGSystem:
 
             # Add course content chunks to vector store
             self.vector_store.add_course_content(course_chunks)
+            self._catalog_version += 1
 
             return course, len(course_chunks)
         except Exception as e:
@@ -73,6 +101,7 @@ class RAGSystem:
         if clear_existing:
             print("Clearing existing data for fresh rebuild...")
             self.vector_store.clear_all_data()
+            self._catalog_version += 1
 
         if not os.path.exists(folder_path):
             print(f"Folder {folder_path} does not exist")
@@ -81,6 +110,10 @@ class RAGSystem:
         # Get existing course titles to avoid re-processing
         existing_course_titles = set(self.vector_store.get_existing_course_titles())
 
+        # New courses are collected first and written in one batch, so their chunks
+        # are embedded together rather than one course at a time
+        new_courses: List[Tuple[Course, List[CourseChunk]]] = []
+
         # Process each file in the folder
         for file_name in os.listdir(folder_path):
             file_path = os.path.join(folder_path, file_name)
@@ -93,41 +126,54 @@ class RAGSystem:
                     )
 
                     if course and course.title not in existing_course_titles:
-                        # This is a new course - add it to the vector store
-                        self.vector_store.add_course_metadata(course)
-                        self.vector_store.add_course_content(course_chunks)
-                        total_courses += 1
-                        total_chunks += len(course_chunks)
-                        print(f"Added new course: {course.title} ({len(course_chunks)} chunks)")
+                        # This is a new course - queue it for the vector store
+                        new_courses.append((course, course_chunks))
                         existing_course_titles.add(course.title)
                     elif course:
                         print(f"Course already exists: {course.title} - skipping")
                 except Exception as e:
                     print(f"Error processing {file_name}: {e}")
 
+        if new_courses:
+            try:
+                self.vector_store.add_courses(new_courses)
+            except Exception as e:
+                print(f"Error adding courses from {folder_path}: {e}")
+                return 0, 0
+            self._catalog_version += 1
+
+            for course, course_chunks in new_courses:
+                total_courses += 1
+                total_chunks += len(course_chunks)
+                print(f"Added new course: {course.title} ({len(course_chunks)} chunks)")
+
         return total_courses, total_chunks
 
-    def query(self, query: str, session_id: Optional[str] = None) -> Tuple[str, List[Dict]]:
+    async def query(
+        self, query: str, session_id: Optional[str] = None, bypass_cache: bool = False
+    ) -> Tuple[str, List[Dict]]:
         """
         Process a user query using the RAG system with tool-based search.
 
         Args:
             query: User's question
             session_id: Optional session ID for conversation context
+            bypass_cache: Skip the semantic answer cache for this query
 
         Returns:
             Tuple of (response, sources list with text and optional links)
         """
-        # Create prompt for the AI with clear instructions
-        prompt = f"""Answer this question about course materials: {query}"""
+        prompt, history = self._prepare_query(query, session_id)
 
-        # Get conversation history if session exists
-        history = None
-        if session_id:
-            history = self.session_manager.get_conversation_history(session_id)
+        catalog_version = self._catalog_version
+        embedding, cached = await self._semantic_cache_lookup(query, history, bypass_cache)
+        if cached:
+            response_text, sources = cached
+            self._record_exchange(query, session_id, response_text)
+            return response_text, sources
 
         # Generate response using AI with tools
-        result = self.ai_generator.generate_response(
+        result = await self.ai_generator.generate_response(
             query=prompt,
             conversation_history=history,
             tools=self.tool_manager.get_tool_definitions(),
@@ -138,22 +184,124 @@ class RAGSystem:
         response_text = result["response"]
         # Metadata available: result["rounds_used"], result["tools_used"]
 
-        # Get sources from the search tool
-        sources = self.tool_manager.get_last_sources()
+        # Sources come from this generation's own tool calls
+        sources = result["sources"]
+        self._record_exchange(query, session_id, response_text)
+        self._semantic_cache_put(embedding, catalog_version, result)
+        return response_text, sources
+
+    async def query_stream(
+        self, query: str, session_id: Optional[str] = None, bypass_cache: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a user query like query(), streaming the answer as it is generated.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+            bypass_cache: Skip the semantic answer cache for this query
+
+        Yields:
+            {"type": "text", "text": str} for each text delta, then a single
+            {"type": "done", "answer": str, "sources": List[Dict]}. A semantic
+            cache hit arrives as one text event with the whole answer
+        """
+        prompt, history = self._prepare_query(query, session_id)
+
+        catalog_version = self._catalog_version
+        embedding, cached = await self._semantic_cache_lookup(query, history, bypass_cache)
+        if cached:
+            response_text, sources = cached
+            self._record_exchange(query, session_id, response_text)
+            yield {"type": "text", "text": response_text}
+            yield {"type": "done", "answer": response_text, "sources": sources}
+            return
+
+        result = None
+        async for event in self.ai_generator.generate_response_stream(
+            query=prompt,
+            conversation_history=history,
+            tools=self.tool_manager.get_tool_definitions(),
+            tool_manager=self.tool_manager,
+        ):
+            if event["type"] == "text":
+                yield event
+            else:
+                result = event
+
+        response_text = result["response"]
+        sources = result["sources"]
+        self._record_exchange(query, session_id, response_text)
+        self._semantic_cache_put(embedding, catalog_version, result)
+        yield {"type": "done", "answer": response_text, "sources": sources}
+
+    def _prepare_query(
+        self, query: str, session_id: Optional[str]
+    ) -> Tuple[str, Optional[List[Dict[str, str]]]]:
+        """Build the AI prompt and fetch conversation history for a query"""
+        # Create prompt for the AI with clear instructions
+        prompt = f"""Answer this question about course materials: {query}"""
 
-        # Reset sources after retrieving them
-        self.tool_manager.reset_sources()
+        # Get conversation history if session exists
+        history = None
+        if session_id:
+            history = self.session_manager.get_conversation_history(session_id)
+
+        return prompt, history
 
-        # Update conversation history
+    async def _semantic_cache_lookup(
+        self, query: str, history: Optional[List[Dict[str, str]]], bypass_cache: bool
+    ) -> Tuple[Optional[Any], Optional[Tuple[str, List[Dict]]]]:
+        """
+        Embed a query and look it up in the semantic cache.
+
+        Returns:
+            Tuple of (query embedding, cached (response, sources)); the embedding is
+            None when the query is not cacheable and the cached answer None on a miss
+        """
+        # Only standalone questions are cached; with history the same words can
+        # mean something else
+        if self.semantic_cache is None or history or bypass_cache:
+            return None, None
+        embedding = await asyncio.to_thread(self.vector_store.embed_query, query)
+        return embedding, self._semantic_cache_get(embedding)
+
+    def _semantic_cache_put(self, embedding, catalog_version: int, result: Dict[str, Any]):
+        """
+        Cache a generated answer, unless the query was not cacheable, courses changed
+        while it was made, or the answer failed (empty, or a tool call errored)
+        """
+        if (
+            embedding is not None
+            and catalog_version == self._catalog_version
+            and result["succeeded"]
+        ):
+            self.semantic_cache.put(embedding, result["response"], result["sources"])
+
+    def _semantic_cache_get(self, embedding) -> Optional[Tuple[str, List[Dict]]]:
+        """Look up a cached answer, first dropping answers from before the last catalog change"""
+        if self._semantic_cache_version != self._catalog_version:
+            self.semantic_cache.clear()
+            self._semantic_cache_version = self._catalog_version
+        return self.semantic_cache.get(embedding)
+
+    def _record_exchange(self, query: str, session_id: Optional[str], response_text: str):
+        """Record the exchange in the session's conversation history"""
         if session_id:
             self.session_manager.add_exchange(session_id, query, response_text)
 
-        # Return response with sources from tool searches
-        return response_text, sources
-
     def get_course_analytics(self) -> Dict:
-        """Get analytics about the course catalog"""
-        return {
+        """Get analytics about the course catalog, cached until courses are added or cleared"""
+        # Read the version first: if a write lands mid-computation, the entry is
+        # stored under the old version and recomputed on the next call
+        version = self._catalog_version
+        cached = self._analytics_cache
+        if cached and cached[0] == version:
+            return cached[1]
+
+        analytics = {
             "total_courses": self.vector_store.get_course_count(),
             "course_titles": self.vector_store.get_existing_course_titles(),
         }
+        self._analytics_cache = (version, analytics)
+        return analytics
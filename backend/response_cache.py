@@ -0,0 +1,48 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+
+class ResponseCache:
+    """Exact-match cache of final LLM answers, backed by SQLite"""
+
+    def __init__(self, db_path: str):
+        # The connection is shared by the event loop and worker threads
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL)"
+            )
+            self.conn.commit()
+
+    @staticmethod
+    def build_key(api_params: Dict[str, Any]) -> str:
+        """Build a stable cache key from the full request (model, system, tools, messages)"""
+        payload = json.dumps(api_params, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response text for a key, if any"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, response: str):
+        """Store the response text for a key"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response) VALUES (?, ?)", (key, response)
+            )
+            self.conn.commit()
+
+    def clear(self):
+        """Remove all cached responses"""
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
@@ -1,9 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from vector_store import SearchResults, VectorStore
 
 
+class ToolError(Exception):
+    """Raised by a tool when it cannot produce a result"""
+
+    pass
+
+
 class Tool(ABC):
     """Abstract base class for all tools"""
 
@@ -14,9 +20,13 @@ class Tool(ABC):
 
     @abstractmethod
     def execute(self, **kwargs) -> str:
-        """Execute the tool with given parameters"""
+        """Execute the tool with given parameters, raising ToolError on failure"""
         pass
 
+    def execute_with_sources(self, **kwargs) -> Tuple[str, List[Dict[str, Any]]]:
+        """Execute the tool and return its result with the sources it used (none by default)"""
+        return self.execute(**kwargs), []
+
 
 class CourseSearchTool(Tool):
     """Tool for searching course content with semantic course name matching"""
@@ -57,8 +67,20 @@ class CourseSearchTool(Tool):
     def execute(
         self, query: str, course_name: Optional[str] = None, lesson_number: Optional[int] = None
     ) -> str:
+        """Execute the search tool, keeping its sources in last_sources"""
+        result, self.last_sources = self.execute_with_sources(
+            query=query, course_name=course_name, lesson_number=lesson_number
+        )
+        return result
+
+    def execute_with_sources(
+        self, query: str, course_name: Optional[str] = None, lesson_number: Optional[int] = None
+    ) -> Tuple[str, List[Dict[str, Any]]]:
         """
-        Execute the search tool with given parameters.
+        Execute the search tool with given parameters, without touching shared state.
+
+        Concurrent searches (several tool calls in one round, or several requests)
+        each get their own sources instead of racing on last_sources.
 
         Args:
             query: What to search for
@@ -66,7 +88,10 @@ class CourseSearchTool(Tool):
             lesson_number: Optional lesson filter
 
         Returns:
-            Formatted search results or error message
+            Tuple of (formatted search results or a no-results message, sources list)
+
+        Raises:
+            ToolError: If the vector store search failed
         """
 
         # Use the vector store's unified search interface
@@ -74,9 +99,11 @@ class CourseSearchTool(Tool):
             query=query, course_name=course_name, lesson_number=lesson_number
         )
 
-        # Handle errors
+        # A broken search is a tool failure; "no such course" is an answer for Claude
+        if results.failed:
+            raise ToolError(results.error)
         if results.error:
-            return results.error
+            return results.error, []
 
         # Handle empty results
         if results.is_empty():
@@ -85,13 +112,13 @@ class CourseSearchTool(Tool):
                 filter_info += f" in course '{course_name}'"
             if lesson_number:
                 filter_info += f" in lesson {lesson_number}"
-            return f"No relevant content found{filter_info}."
+            return f"No relevant content found{filter_info}.", []
 
         # Format and return results
         return self._format_results(results)
 
-    def _format_results(self, results: SearchResults) -> str:
-        """Format search results with course and lesson context"""
+    def _format_results(self, results: SearchResults) -> Tuple[str, List[Dict[str, Any]]]:
+        """Format search results with course and lesson context, returning them with sources"""
         formatted = []
         sources = []  # Track sources for the UI (now with links)
 
@@ -119,10 +146,7 @@ class CourseSearchTool(Tool):
 
             formatted.append(f"{header}\n{doc}")
 
-        # Store sources for retrieval
-        self.last_sources = sources
-
-        return "\n\n".join(formatted)
+        return "\n\n".join(formatted), sources
 
 
 class CourseOutlineTool(Tool):
@@ -159,7 +183,10 @@ class CourseOutlineTool(Tool):
             course_name: Course name or partial name to get outline for
 
         Returns:
-            Formatted course outline or error message
+            Formatted course outline, or a not-found message
+
+        Raises:
+            ToolError: If the course metadata could not be read
         """
         # Resolve the course name using fuzzy matching
         course_title = self.store._resolve_course_name(course_name)
@@ -204,7 +231,7 @@ class CourseOutlineTool(Tool):
             return outline
 
         except Exception as e:
-            return f"Error retrieving course outline: {str(e)}"
+            raise ToolError(f"Error retrieving course outline: {str(e)}") from e
 
 
 class ToolManager:
@@ -212,6 +239,7 @@ class ToolManager:
 
     def __init__(self):
         self.tools = {}
+        self._definitions: Optional[List[Dict[str, Any]]] = None  # Built on first use
 
     def register_tool(self, tool: Tool):
         """Register any tool that implements the Tool interface"""
@@ -220,18 +248,30 @@ class ToolManager:
         if not tool_name:
             raise ValueError("Tool must have a 'name' in its definition")
         self.tools[tool_name] = tool
+        self._definitions = None
 
     def get_tool_definitions(self) -> list:
-        """Get all tool definitions for Anthropic tool calling"""
-        return [tool.get_tool_definition() for tool in self.tools.values()]
+        """Get all tool definitions for Anthropic tool calling (built once; do not mutate)"""
+        if self._definitions is None:
+            self._definitions = [tool.get_tool_definition() for tool in self.tools.values()]
+        return self._definitions
 
     def execute_tool(self, tool_name: str, **kwargs) -> str:
-        """Execute a tool by name with given parameters"""
+        """Execute a tool by name with given parameters, raising ToolError on failure"""
         if tool_name not in self.tools:
-            return f"Tool '{tool_name}' not found"
+            raise ToolError(f"Tool '{tool_name}' not found")
 
         return self.tools[tool_name].execute(**kwargs)
 
+    def execute_tool_with_sources(
+        self, tool_name: str, **kwargs
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """Execute a tool by name, returning its result and the sources of this call only"""
+        if tool_name not in self.tools:
+            raise ToolError(f"Tool '{tool_name}' not found")
+
+        return self.tools[tool_name].execute_with_sources(**kwargs)
+
     def get_last_sources(self) -> list:
         """Get sources from the last search operation"""
         # Check all tools for last_sources attribute
@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class SemanticCache:
+    """In-memory cache of final answers keyed by query embedding, so near-duplicate questions hit"""
+
+    def __init__(self, threshold: float = 0.95, maxsize: int = 1024, ttl: float = 300.0):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (unit embedding, response, sources, expiry); oldest first for LRU eviction
+        self._entries: "OrderedDict[int, Tuple[np.ndarray, str, List[Dict], float]]" = OrderedDict()
+        self._next_key = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, embedding) -> Optional[Tuple[str, List[Dict]]]:
+        """Return (response, sources) of the most similar live entry at or above the threshold"""
+        query = self._normalize(embedding)
+        now = time.monotonic()
+        with self.lock:
+            for key in [k for k, entry in self._entries.items() if entry[3] <= now]:
+                del self._entries[key]
+            if not self._entries:
+                return None
+
+            keys = list(self._entries)
+            # Cosine similarity of unit vectors, against every entry in one product
+            similarities = np.stack([self._entries[k][0] for k in keys]) @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+
+            key = keys[best]
+            self._entries.move_to_end(key)
+            _, response, sources, _ = self._entries[key]
+        return response, list(sources)
+
+    def put(self, embedding, response: str, sources: List[Dict]):
+        """Store the answer for a query embedding, evicting the least recently used entry if full"""
+        entry = (self._normalize(embedding), response, list(sources), time.monotonic() + self.ttl)
+        with self.lock:
+            self._entries[self._next_key] = entry
+            self._next_key += 1
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached answers"""
+        with self.lock:
+            self._entries.clear()
@@ -2,24 +2,95 @@
 Pytest configuration and shared fixtures for RAG system tests
 """
 
+import asyncio
 import os
-import sys
-from pathlib import Path
-from typing import Dict, List
-from unittest.mock import MagicMock, Mock, patch
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+from unittest.mock import AsyncMock, MagicMock, Mock, create_autospec, patch
 
+import httpx
+import orjson
 import pytest
+from fastapi import APIRouter, Depends, FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from starlette.datastructures import MutableHeaders
+
+try:
+    import uvloop
+except ImportError:  # uvloop is not installed on Windows
+    uvloop = None
+
+import ai_generator
+from config import config as app_config
+from embedding_cache import EmbeddingCache
+from models import Course, CourseChunk, Lesson
+from rag_system import RAGSystem
+from search_tools import CourseSearchTool, ToolManager
+from session_manager import SessionManager
+from tests.fake_chroma import FakeChromaClient
+from tests.responses import FakeAnthropic, make_text_response, make_tool_use, make_tool_use_response
+from vector_store import SearchResults, VectorStore, get_embedding_function
 
-# Add parent directory to path so we can import backend modules
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from models import Course, CourseChunk, Lesson
-from vector_store import SearchResults
+def pytest_configure(config):
+    """
+    Give each pytest-xdist worker its own on-disk stores.
 
+    Mocked sessions live in each worker's process, but tests that build a
+    RAGSystem from the real config would otherwise share one ChromaDB
+    directory and SQLite caches across workers.
+    """
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    if worker:
+        for name in ("CHROMA_PATH", "RESPONSE_CACHE_PATH", "EMBEDDING_CACHE_PATH"):
+            root, ext = os.path.splitext(getattr(app_config, name))
+            setattr(app_config, name, f"{root}_{worker}{ext}")
 
-@pytest.fixture
+
+@pytest.fixture(scope="session")
+def event_loop_policy():
+    """Run async tests on uvloop, as uvicorn does in production, where it is installed"""
+    if uvloop is None:
+        return asyncio.DefaultEventLoopPolicy()
+    return uvloop.EventLoopPolicy()
+
+
+# Pydantic models mirroring app.py, defined once at import time
+class QueryRequest(BaseModel):
+    query: str
+    session_id: Optional[str] = None
+
+
+class SourceItem(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    text: str
+    link: Optional[str] = None
+
+
+class QueryResponse(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    answer: str
+    sources: List[SourceItem]
+    session_id: str
+
+
+class CourseStats(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    total_courses: int
+    course_titles: List[str]
+
+
+def to_source_items(sources):
+    """Convert source dicts ({"text": ..., "link": ...}) to SourceItem objects"""
+    return [SourceItem.model_validate(src) for src in sources]
+
+
+@pytest.fixture(scope="session")
 def sample_course():
-    """Create a sample course for testing"""
+    """Create a sample course for testing; shared by the session, so treat it as read-only"""
     return Course(
         title="Introduction to MCP",
         course_link="https://example.com/mcp",
@@ -44,9 +115,9 @@ def sample_course():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_course_chunks(sample_course):
-    """Create sample course chunks for testing"""
+    """Create sample course chunks for testing; shared by the session, so treat them as read-only"""
     return [
         CourseChunk(
             content="MCP stands for Model Context Protocol. It's a protocol for AI applications.",
@@ -75,9 +146,9 @@ def sample_course_chunks(sample_course):
     ]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_search_results(sample_course_chunks):
-    """Create sample search results matching the course chunks"""
+    """Create sample search results matching the course chunks; shared, so treat as read-only"""
     return SearchResults(
         documents=[chunk.content for chunk in sample_course_chunks[:3]],
         metadata=[
@@ -104,31 +175,124 @@ def sample_search_results(sample_course_chunks):
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def empty_search_results():
-    """Create empty search results for testing"""
+    """Create empty search results for testing; shared by the session, so treat as read-only"""
     return SearchResults(documents=[], metadata=[], distances=[])
 
 
+@pytest.fixture(scope="session")
+def outline_catalog_response(sample_course):
+    """
+    Return the sample course as course_catalog.get() returns it, for outline tool tests.
+
+    Shared by the session, so treat as read-only.
+    """
+    lessons = [
+        {
+            "lesson_number": lesson.lesson_number,
+            "lesson_title": lesson.title,
+            "lesson_link": lesson.lesson_link,
+        }
+        for lesson in sample_course.lessons
+    ]
+    return {
+        "metadatas": [
+            {
+                "course_link": sample_course.course_link,
+                "instructor": sample_course.instructor,
+                "lessons_json": orjson.dumps(lessons).decode(),
+            }
+        ]
+    }
+
+
+# Autospec'd once; mock_vector_store resets and reconfigures it for each test instead
+# of introspecting VectorStore again. course_catalog is set in __init__, so it is added
+# separately. Calls that don't match VectorStore's signatures fail.
+_VECTOR_STORE_MOCK_PROTOTYPE = create_autospec(VectorStore, instance=True)
+_VECTOR_STORE_MOCK_PROTOTYPE.course_catalog = Mock()
+
+
 @pytest.fixture
 def mock_vector_store():
-    """Create a mock vector store for testing"""
-    mock = Mock()
+    """Return the shared mock vector store, reset to its defaults"""
+    mock = _VECTOR_STORE_MOCK_PROTOTYPE
+    mock.reset_mock(return_value=True, side_effect=True)
     mock.max_results = 5
-    mock.search = Mock()
-    mock._resolve_course_name = Mock(return_value="Introduction to MCP")
-    mock.get_lesson_link = Mock(return_value="https://example.com/mcp/lesson-0")
+    mock._resolve_course_name.return_value = "Introduction to MCP"
+    mock.get_lesson_link.return_value = "https://example.com/mcp/lesson-0"
     return mock
 
 
+@pytest.fixture(scope="session")
+def shared_tool_manager():
+    """Build one ToolManager with a CourseSearchTool over a mock vector store for the session"""
+    manager = ToolManager()
+    manager.register_tool(CourseSearchTool(Mock()))
+    return manager
+
+
+@pytest.fixture
+def tool_manager(shared_tool_manager):
+    """
+    Return the shared tool manager with its sources cleared and its vector store mock reset.
+
+    Configure the store through tool_manager.tools["search_course_content"].store.
+    """
+    shared_tool_manager.reset_sources()
+    shared_tool_manager.tools["search_course_content"].store.reset_mock(
+        return_value=True, side_effect=True
+    )
+    return shared_tool_manager
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _patched_anthropic():
+    """Patch anthropic.AsyncAnthropic once for the whole session so no test builds a real client"""
+    with patch.object(ai_generator.anthropic, "AsyncAnthropic") as mock_class:
+        yield mock_class
+
+
+@pytest.fixture(autouse=True)
+def mock_anthropic(_patched_anthropic):
+    """Return the patched AsyncAnthropic class, reset for this test"""
+    _patched_anthropic.reset_mock(return_value=True, side_effect=True)
+    return _patched_anthropic
+
+
+@pytest.fixture(scope="session")
+def fake_claude():
+    """
+    Return a builder of FakeAnthropic clients from a script of turns.
+
+    Each turn is ("text", answer) or ("tool", (name, id, input)), e.g.
+    fake_claude([("tool", ("search_course_content", "tool_1", {"query": "MCP"})), ("text", "...")])
+    """
+
+    def make(script):
+        return FakeAnthropic(
+            *(
+                (
+                    make_text_response(payload)
+                    if kind == "text"
+                    else make_tool_use_response(make_tool_use(*payload))
+                )
+                for kind, payload in script
+            )
+        )
+
+    return make
+
+
 @pytest.fixture
 def mock_anthropic_client():
     """Create a mock Anthropic client for testing"""
-    mock_client = Mock()
+    mock_client = AsyncMock()
     mock_response = Mock()
-    mock_response.content = [Mock(text="This is a test response")]
+    mock_response.content = [Mock(type="text", text="This is a test response")]
     mock_response.stop_reason = "end_turn"
-    mock_client.messages.create = Mock(return_value=mock_response)
+    mock_client.messages.create = AsyncMock(return_value=mock_response)
     return mock_client
 
 
@@ -150,172 +314,449 @@ def mock_tool_use_response():
 
 
 @pytest.fixture
-def test_data_dir():
-    """Return path to test data directory"""
-    return Path(__file__).parent / "test_data"
+def test_data_dir(tmp_path):
+    """Return an empty per-test directory for course files, so no test sees another's files"""
+    data_dir = tmp_path / "test_data"
+    data_dir.mkdir()
+    return data_dir
+
+
+@pytest.fixture(scope="session")
+def warm_embedding_function():
+    """
+    Load the configured embedding model and run it once, before the first test that needs it.
+
+    The model load and first inference then stay out of that test's own timing.
+    """
+    embedding_function = get_embedding_function(
+        app_config.EMBEDDING_MODEL, app_config.EMBEDDING_BACKEND
+    )
+    embedding_function(["warm-up"])
+    return embedding_function
+
+
+@pytest.fixture(autouse=True)
+def _warm_embedding_for_chroma_tests(request):
+    """Warm the embedding model before any test marked chroma, and only for those"""
+    if request.node.get_closest_marker("chroma"):
+        request.getfixturevalue("warm_embedding_function")
+
+
+@pytest.fixture(scope="session")
+def temp_chroma_path(tmp_path_factory):
+    """
+    Return a ChromaDB path shared by the session, so its client and SQLite file open once.
+
+    Only for tests that open a store without writing to it; tests that add data use
+    vector_store, or a path under their own tmp_path. tmp_path_factory is per xdist worker.
+    """
+    return str(tmp_path_factory.mktemp("test_chroma_db"))
+
+
+@pytest.fixture(scope="session")
+def embedding_cache():
+    """
+    One in-memory embedding cache for the session.
+
+    The sample chunks are fixed, so stores built with it embed each of them only once.
+    """
+    return EmbeddingCache(":memory:")
+
+
+@pytest.fixture(scope="session")
+def _session_vector_store(tmp_path_factory, warm_embedding_function, embedding_cache):
+    """One writable VectorStore for the session; tests get it through vector_store"""
+    return VectorStore(
+        str(tmp_path_factory.mktemp("chroma")),
+        app_config.EMBEDDING_MODEL,
+        max_results=5,
+        embedding_cache=embedding_cache,
+    )
 
 
 @pytest.fixture
-def temp_chroma_path(tmp_path):
-    """Create temporary ChromaDB path for testing"""
-    chroma_dir = tmp_path / "test_chroma_db"
-    chroma_dir.mkdir()
-    return str(chroma_dir)
+def vector_store(_session_vector_store):
+    """Return an empty VectorStore for tests that add or clear data; emptied again afterwards"""
+    yield _session_vector_store
+    _session_vector_store.clear_all_data()
+
+
+@pytest.fixture
+def fake_vector_store(monkeypatch):
+    """
+    Return a VectorStore backed by an in-memory fake Chroma client and no embedding model.
+
+    For tests of filtering, lookups and counts; queries are not ranked by similarity.
+    """
+    monkeypatch.setattr("chromadb.PersistentClient", FakeChromaClient)
+    monkeypatch.setattr("vector_store.get_embedding_function", lambda model_name, backend: None)
+    return VectorStore("unused", app_config.EMBEDDING_MODEL, max_results=5)
+
+
+@pytest.fixture(scope="session")
+def populated_vector_store(
+    tmp_path_factory, warm_embedding_function, embedding_cache, sample_course, sample_course_chunks
+):
+    """
+    Return one VectorStore holding the sample course, built and embedded once per session.
+
+    Shared by every test that only reads from it; tests that write use vector_store.
+    """
+    store = VectorStore(
+        str(tmp_path_factory.mktemp("chroma")),
+        app_config.EMBEDDING_MODEL,
+        max_results=5,
+        embedding_cache=embedding_cache,
+    )
+    store.add_course_metadata(sample_course)
+    store.add_course_content(sample_course_chunks)
+    return store
 
 
 # ============================================================================
 # API Testing Fixtures
 # ============================================================================
 
-@pytest.fixture
-def mock_rag_system(sample_course, sample_search_results):
-    """Create a mock RAG system for API testing"""
-    mock_rag = Mock()
+# Canned RAG system outputs shared by the recording mock and the plain stub
+_MOCK_ANSWER = "This is a test answer about MCP."
+# Sources are {"text", "link"} dicts, the shape RAGSystem hands to the endpoints
+_MOCK_SOURCES = (
+    {"text": "Introduction to MCP - Lesson 0", "link": "https://example.com/mcp/lesson-0"},
+    {"text": "Introduction to MCP - Lesson 1", "link": "https://example.com/mcp/lesson-1"},
+)
+_MOCK_ANALYTICS = {
+    "total_courses": 1,
+    "course_titles": ["Introduction to MCP"]
+}
+
+
+async def _mock_query_stream(query, session_id):
+    """Yield the mock answer in two text deltas, then the done event"""
+    yield {"type": "text", "text": "This is a test answer "}
+    yield {"type": "text", "text": "about MCP."}
+    yield {
+        "type": "done",
+        "answer": _MOCK_ANSWER,
+        "sources": _MOCK_SOURCES[:1],
+    }
 
+
+def _configure_rag_mock(mock_rag):
+    """Apply the default return values and side effects to a RAG system mock"""
     # Mock session manager
-    mock_rag.session_manager = Mock()
-    mock_rag.session_manager.create_session = Mock(return_value="test_session_123")
-    mock_rag.session_manager.clear_session = Mock()
+    mock_rag.session_manager.create_session.return_value = "test_session_123"
 
     # Mock query method to return sample answer and sources
-    mock_rag.query = Mock(return_value=(
-        "This is a test answer about MCP.",
-        [
-            {"text": "Introduction to MCP - Lesson 0", "link": "https://example.com/mcp/lesson-0"},
-            {"text": "Introduction to MCP - Lesson 1", "link": "https://example.com/mcp/lesson-1"},
-        ]
-    ))
+    mock_rag.query.return_value = (_MOCK_ANSWER, _MOCK_SOURCES)
+
+    # Mock streaming query to yield the same answer in two text deltas
+    mock_rag.query_stream.side_effect = _mock_query_stream
 
     # Mock course analytics
-    mock_rag.get_course_analytics = Mock(return_value={
-        "total_courses": 1,
-        "course_titles": [sample_course.title]
-    })
+    mock_rag.get_course_analytics.return_value = _MOCK_ANALYTICS
 
     return mock_rag
 
 
+# Autospec'd once; mock_rag_system resets and reconfigures it for each test instead of
+# introspecting RAGSystem again. session_manager is set in __init__, so it is specced
+# separately. Both reject attributes and call signatures the real classes lack.
+_RAG_MOCK_PROTOTYPE = create_autospec(RAGSystem, instance=True)
+_RAG_MOCK_PROTOTYPE.session_manager = create_autospec(SessionManager, instance=True)
+
+
 @pytest.fixture
-def test_app(mock_rag_system):
+def mock_rag_system():
     """
-    Create a test FastAPI app without static file mounting.
+    Return the shared mock RAG system for API testing, reset to its defaults.
 
-    This avoids import issues in the test environment where the frontend
-    directory may not exist. The app is created with all API endpoints
-    but without the static file handler.
+    Sources handed to the endpoints must be SourceItems or {"text", "link"}
+    dicts, matching what RAGSystem returns.
+
+    Request this fixture to assert on calls or change behavior; the client
+    fixtures then serve it instead of the non-recording stub.
     """
-    from fastapi import FastAPI, HTTPException
-    from fastapi.middleware.cors import CORSMiddleware
-    from fastapi.middleware.trustedhost import TrustedHostMiddleware
-    from pydantic import BaseModel
-    from typing import List, Optional
+    _RAG_MOCK_PROTOTYPE.reset_mock(return_value=True, side_effect=True)
+    return _configure_rag_mock(_RAG_MOCK_PROTOTYPE)
 
-    # Create test app
-    app = FastAPI(title="Course Materials RAG System (Test)", root_path="")
 
-    # Add middleware
-    app.add_middleware(
-        TrustedHostMiddleware,
-        allowed_hosts=["*"]
-    )
+class _StubSessionManager:
+    def create_session(self):
+        return "test_session_123"
 
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=["*"],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
-        expose_headers=["*"],
-    )
+    def clear_session(self, session_id):
+        pass
 
-    # Pydantic models
-    class QueryRequest(BaseModel):
-        query: str
-        session_id: Optional[str] = None
 
-    class SourceItem(BaseModel):
-        text: str
-        link: Optional[str] = None
+class _StubRAGSystem:
+    """Plain-function stand-in for RAGSystem with the mock's defaults and no call recording"""
 
-    class QueryResponse(BaseModel):
-        answer: str
-        sources: List[SourceItem]
-        session_id: str
+    session_manager = _StubSessionManager()
 
-    class CourseStats(BaseModel):
-        total_courses: int
-        course_titles: List[str]
+    async def query(self, query, session_id):
+        return _MOCK_ANSWER, _MOCK_SOURCES
 
-    # API Endpoints
-    @app.post("/api/query", response_model=QueryResponse)
-    async def query_documents(request: QueryRequest):
-        """Process a query and return response with sources"""
-        try:
-            session_id = request.session_id
-            if not session_id:
-                session_id = mock_rag_system.session_manager.create_session()
+    def query_stream(self, query, session_id):
+        return _mock_query_stream(query, session_id)
 
-            answer, sources = mock_rag_system.query(request.query, session_id)
+    def get_course_analytics(self):
+        return _MOCK_ANALYTICS
 
-            source_items = [SourceItem(**src) if isinstance(src, dict) else SourceItem(text=src) for src in sources]
 
-            return QueryResponse(
-                answer=answer,
-                sources=source_items,
-                session_id=session_id
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+_RAG_STUB = _StubRAGSystem()
 
-    @app.get("/api/courses", response_model=CourseStats)
-    async def get_course_stats():
-        """Get course analytics and statistics"""
-        try:
-            analytics = mock_rag_system.get_course_analytics()
-            return CourseStats(
-                total_courses=analytics["total_courses"],
-                course_titles=analytics["course_titles"]
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+def _rag_for(request):
+    """Serve the recording mock_rag_system if the test requested it, else the stub"""
+    if "mock_rag_system" in request.fixturenames:
+        return request.getfixturevalue("mock_rag_system")
+    return _RAG_STUB
+
+
+def get_rag(request: Request):
+    """Return the RAG system the test app is currently serving"""
+    return request.app.state.rag
 
-    @app.delete("/api/session/{session_id}")
-    async def delete_session(session_id: str):
-        """Delete a conversation session and clear its history"""
+
+# API endpoints, defined once at import time and shared by every test app
+api_router = APIRouter()
+
+
+@api_router.post("/api/query", response_model=QueryResponse)
+async def query_documents(request: QueryRequest, rag=Depends(get_rag)):
+    """Process a query and return response with sources"""
+    session_id = request.session_id
+    if not session_id:
+        session_id = rag.session_manager.create_session()
+
+    answer, sources = await rag.query(request.query, session_id)
+
+    response = QueryResponse(
+        answer=answer,
+        sources=to_source_items(sources),
+        session_id=session_id
+    )
+    return ORJSONResponse(response.model_dump())
+
+
+@api_router.post("/api/query/stream")
+async def query_documents_stream(
+    request: QueryRequest, http_request: Request, rag=Depends(get_rag)
+):
+    """Process a query and stream the answer as Server-Sent Events"""
+    session_id = request.session_id or rag.session_manager.create_session()
+
+    async def event_stream():
         try:
-            mock_rag_system.session_manager.clear_session(session_id)
-            return {"status": "success", "message": f"Session {session_id} deleted"}
+            async for event in rag.query_stream(request.query, session_id):
+                if event["type"] == "done":
+                    event = {
+                        "type": "done",
+                        "answer": event["answer"],
+                        "sources": [item.model_dump() for item in to_source_items(event["sources"])],
+                        "session_id": session_id,
+                    }
+                yield b"data: " + orjson.dumps(event) + b"\n\n"
         except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            # As in unhandled_exception_handler, the message is only exposed in dev mode
+            if http_request.app.state.dev_mode:
+                yield b"data: " + orjson.dumps({"type": "error", "detail": str(e)}) + b"\n\n"
+            else:
+                yield INTERNAL_ERROR_FRAME
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@api_router.get("/api/courses", response_model=CourseStats)
+async def get_course_stats(rag=Depends(get_rag)):
+    """Get course analytics and statistics"""
+    analytics = await asyncio.to_thread(rag.get_course_analytics)
+    stats = CourseStats(
+        total_courses=analytics["total_courses"],
+        course_titles=analytics["course_titles"]
+    )
+    return ORJSONResponse(stats.model_dump())
+
+
+@api_router.delete("/api/session/{session_id}")
+async def delete_session(session_id: str, rag=Depends(get_rag)):
+    """Delete a conversation session and clear its history"""
+    rag.session_manager.clear_session(session_id)
+    return {"status": "success", "message": f"Session {session_id} deleted"}
+
+
+# The health check and generic error bodies never change, so they are encoded once
+_ROOT_BODY = orjson.dumps({"status": "ok", "message": "RAG System API"})
+INTERNAL_ERROR_BODY = orjson.dumps({"detail": "Internal server error"})
+# Error frame sent when a stream fails outside dev mode, encoded once
+INTERNAL_ERROR_FRAME = (
+    b"data: " + orjson.dumps({"type": "error", "detail": "Internal server error"}) + b"\n\n"
+)
+
+
+@api_router.get("/")
+async def root():
+    """Root endpoint for health checks"""
+    return Response(content=_ROOT_BODY, media_type="application/json")
+
+
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    """Report errors raised by the endpoints as a 500; the message is only exposed in dev mode"""
+    if request.app.state.dev_mode:
+        return ORJSONResponse(status_code=500, content={"detail": str(exc)})
+    return Response(content=INTERNAL_ERROR_BODY, status_code=500, media_type="application/json")
+
+
+# Cache headers mirroring app.py: only ?v= versioned JS and CSS are immutable
+REVALIDATE_CACHE_HEADERS = {"Cache-Control": "no-cache"}
+ASSET_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+VERSIONED_ASSET_SUFFIXES = (".js", ".css")
+
 
-    @app.get("/")
-    async def root():
-        """Root endpoint for health checks"""
-        return {"status": "ok", "message": "RAG System API"}
+class StaticCacheMiddleware:
+    """Mirror of app.py's middleware that sets cache headers outside /api/ (production mode)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path.startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        if path.endswith(VERSIONED_ASSET_SUFFIXES) and self._is_versioned(scope):
+            cache_headers = ASSET_CACHE_HEADERS
+        else:
+            cache_headers = REVALIDATE_CACHE_HEADERS
+
+        async def send_with_cache_headers(message):
+            if message["type"] == "http.response.start" and message["status"] in (200, 304):
+                headers = MutableHeaders(scope=message)
+                for name, value in cache_headers.items():
+                    headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_headers)
+
+    @staticmethod
+    def _is_versioned(scope) -> bool:
+        return "v" in parse_qs(scope.get("query_string", b"").decode("latin-1"))
+
+
+def _build_test_app(with_middleware=False):
+    """
+    Create a test FastAPI app without static file mounting.
+
+    This avoids import issues in the test environment where the frontend
+    directory may not exist. The app includes api_router, which has all
+    API endpoints but not the static file handler.
+
+    Endpoints get the RAG system through Depends(get_rag), which reads
+    app.state.rag; the client fixtures point it at each test's mock. The
+    production cache-header, TrustedHost and CORS middleware is only added
+    when with_middleware is set.
+    """
+    # Create test app
+    app = FastAPI(
+        title="Course Materials RAG System (Test)",
+        root_path="",
+        default_response_class=ORJSONResponse,
+    )
+
+    if with_middleware:
+        app.add_middleware(StaticCacheMiddleware)
+
+        app.add_middleware(
+            TrustedHostMiddleware,
+            allowed_hosts=["*"]
+        )
+
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=["*"],
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+            expose_headers=["*"],
+        )
+
+    app.include_router(api_router)
+    app.add_exception_handler(Exception, unhandled_exception_handler)
 
     return app
 
 
+@pytest.fixture(scope="session")
+def test_app():
+    """Create the test app once per session, without middleware"""
+    return _build_test_app()
+
+
+@pytest.fixture(scope="session")
+def cors_app():
+    """Create a test app with the production TrustedHost/CORS middleware"""
+    return _build_test_app(with_middleware=True)
+
+
+def _reset_test_app(test_app, rag):
+    """Point the shared test app at this test's RAG system and drop per-test overrides"""
+    test_app.state.rag = rag
+    # Tests opt in to exposing error messages, as ENV=dev does in production
+    test_app.state.dev_mode = False
+    test_app.dependency_overrides.clear()
+
+
 @pytest.fixture
-def client(test_app):
-    """Create a test client for API testing"""
-    from fastapi.testclient import TestClient
-    return TestClient(test_app)
+async def async_client(request, test_app):
+    """
+    Create an async HTTP client that calls the test app in-process over ASGI.
+
+    Unlike FastAPI's TestClient there is no sync bridge: requests run on the test's own
+    event loop, without a thread hop per call.
+    """
+    _reset_test_app(test_app, _rag_for(request))
+    transport = httpx.ASGITransport(app=test_app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
 
 
 @pytest.fixture
-def sample_query_request():
-    """Sample query request payload for API testing"""
+async def cors_client(request, cors_app):
+    """Create an async HTTP client for the middleware-enabled test app"""
+    _reset_test_app(cors_app, _rag_for(request))
+    transport = httpx.ASGITransport(app=cors_app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture(scope="session")
+def sample_query_request(request):
+    """
+    Sample query request payload for API testing.
+
+    Built once per session (and per indirect parameter); treat it as read-only.
+
+    Parametrize indirectly with a session ID to send an existing session:
+    @pytest.mark.parametrize("sample_query_request", ["test_session_123"], indirect=True)
+    """
     return {
         "query": "What is MCP?",
-        "session_id": None
+        "session_id": getattr(request, "param", None)
     }
 
 
-@pytest.fixture
-def sample_query_request_with_session():
-    """Sample query request with session ID for API testing"""
-    return {
-        "query": "Tell me more about MCP servers",
-        "session_id": "test_session_123"
-    }
+@pytest.fixture(scope="session")
+def query_response_adapter():
+    """
+    Validator for /api/query response bodies, built once per session.
+
+    validate_json() checks the body against QueryResponse in one pass, including
+    field types and that no unexpected fields are present.
+    """
+    return TypeAdapter(QueryResponse)
+
+
+@pytest.fixture(scope="session")
+def course_stats_adapter():
+    """Validator for /api/courses response bodies, built once per session"""
+    return TypeAdapter(CourseStats)
@@ -0,0 +1,70 @@
+"""
+In-memory stand-in for the parts of the ChromaDB client API that VectorStore uses
+
+For tests of VectorStore logic that does not depend on similarity: query()
+returns matching records in insertion order, not ranked by distance, and
+nothing is embedded.
+"""
+
+
+def _matches(metadata, where):
+    """Apply the equality and $and filters VectorStore builds"""
+    if not where:
+        return True
+    if "$and" in where:
+        return all(_matches(metadata, clause) for clause in where["$and"])
+    return all(metadata.get(key) == value for key, value in where.items())
+
+
+class FakeCollection:
+    """A collection keeping (document, metadata) per id in a dict"""
+
+    def __init__(self, configuration=None):
+        self.records = {}
+        self.configuration = configuration or {}
+
+    def add(self, documents, metadatas, ids, embeddings=None):
+        for id_, document, metadata in zip(ids, documents, metadatas):
+            self.records[id_] = (document, metadata)
+
+    def count(self):
+        return len(self.records)
+
+    def get(self, ids=None):
+        ids = list(self.records) if ids is None else [id_ for id_ in ids if id_ in self.records]
+        return {
+            "ids": ids,
+            "documents": [self.records[id_][0] for id_ in ids],
+            "metadatas": [self.records[id_][1] for id_ in ids],
+        }
+
+    def query(self, query_texts, n_results, where=None):
+        hits = [record for record in self.records.values() if _matches(record[1], where)]
+        hits = hits[:n_results]
+        return {
+            "documents": [[document for document, _ in hits]],
+            "metadatas": [[metadata for _, metadata in hits]],
+            "distances": [[0.0] * len(hits)],
+        }
+
+
+class FakeChromaClient:
+    """A client holding FakeCollections by name"""
+
+    def __init__(self, *args, **kwargs):
+        self.collections = {}
+
+    def get_or_create_collection(self, name, configuration=None, **kwargs):
+        if name not in self.collections:
+            self.create_collection(name, configuration)
+        return self.collections[name]
+
+    def create_collection(self, name, configuration=None, **kwargs):
+        self.collections[name] = FakeCollection(configuration)
+        return self.collections[name]
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+    def get_max_batch_size(self):
+        return 5461
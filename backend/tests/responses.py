@@ -0,0 +1,42 @@
+"""
+Builders for canned Anthropic Messages API responses used across the tests
+
+Content blocks are the SDK's own types, so code that calls model_dump() on them
+behaves as it does in production; the response wrapper is a plain namespace.
+"""
+
+from types import SimpleNamespace
+
+from anthropic.types import TextBlock, ToolUseBlock
+
+
+def make_text_response(text, stop_reason="end_turn"):
+    """Build a Messages API response carrying a single text block"""
+    return SimpleNamespace(content=[TextBlock(type="text", text=text)], stop_reason=stop_reason)
+
+
+def make_tool_use(name, id_, input_):
+    """Build a tool_use content block"""
+    return ToolUseBlock(type="tool_use", id=id_, name=name, input=input_)
+
+
+def make_tool_use_response(*blocks):
+    """Build a Messages API response that stopped to request the given tool_use blocks"""
+    return SimpleNamespace(content=list(blocks), stop_reason="tool_use")
+
+
+class FakeAnthropic:
+    """
+    Stand-in for AsyncAnthropic that answers messages.create from a fixed queue.
+
+    Each call's keyword arguments are appended to calls, in order.
+    """
+
+    def __init__(self, *responses):
+        self._responses = list(responses)
+        self.calls = []
+        self.messages = self
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return self._responses.pop(0)
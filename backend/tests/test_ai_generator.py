@@ -8,18 +8,83 @@ These tests verify that:
 - Response formatting works
 """
 
-import sys
-from pathlib import Path
-from unittest.mock import MagicMock, Mock, patch
+import re
+import threading
+from collections import namedtuple
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
 
+import anthropic
 import pytest
-
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from ai_generator import AIGenerator
-from search_tools import CourseSearchTool, ToolManager
+from anthropic.resources.messages import AsyncMessages
+from anthropic.types import TextBlock, ToolUseBlock
+from response_cache import ResponseCache
+from search_tools import ToolError
+from tests.responses import (
+    FakeAnthropic,
+    make_text_response,
+    make_tool_use,
+    make_tool_use_response,
+)
 from vector_store import SearchResults
 
+# Tool names the system prompt must mention, matched in one scan
+_REQUIRED_TOOLS_RE = re.compile(r"(search_course_content|get_course_outline)")
+
+# Attribute names of the SDK client, listed once; spec'd mocks reject typos such as
+# client.mesages instead of silently creating a child mock
+_CLIENT_SPEC = dir(anthropic.AsyncAnthropic)
+_MESSAGES_SPEC = dir(AsyncMessages)
+
+
+def make_client():
+    """Build a mock AsyncAnthropic client with an awaitable messages.create"""
+    client = Mock(spec=_CLIENT_SPEC)
+    client.messages = Mock(spec=_MESSAGES_SPEC)
+    client.messages.create = AsyncMock()
+    return client
+
+
+def scripted(*responses):
+    """Build an awaitable messages.create that returns responses in order without recording calls"""
+    remaining = iter(responses)
+
+    async def create(**kwargs):
+        return next(remaining)
+
+    return create
+
+
+class Spy:
+    """Callable that records its calls; much cheaper than Mock when only recording is needed
+
+    side_effect is either an exception instance to raise or a callable whose result is
+    returned; otherwise every call returns return_value.
+    """
+
+    def __init__(self, return_value=None, side_effect=None):
+        self.calls = []
+        self.return_value = return_value
+        self.side_effect = side_effect
+
+    def __call__(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        if isinstance(self.side_effect, BaseException):
+            raise self.side_effect
+        if self.side_effect is not None:
+            return self.side_effect(*args, **kwargs)
+        return self.return_value
+
+
+def make_tool_manager(return_value=None, side_effect=None):
+    """Build a tool manager stand-in whose execute_tool is a Spy; calls report no sources"""
+    execute_tool = Spy(return_value, side_effect)
+    return SimpleNamespace(
+        execute_tool=execute_tool,
+        execute_tool_with_sources=lambda name, **kwargs: (execute_tool(name, **kwargs), []),
+    )
+
 
 class TestAIGeneratorInitialization:
     """Test AIGenerator initialization"""
@@ -36,158 +101,134 @@ class TestAIGeneratorInitialization:
         assert generator.base_params["temperature"] == 0
         assert generator.base_params["max_tokens"] == 800
 
+    def test_init_uses_injected_client(self):
+        """Test that a client passed to the constructor is used instead of building one"""
+        client = make_client()
+
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514", client=client)
+
+        assert generator.client is client
+
     def test_system_prompt_is_set(self):
         """Test that system prompt is properly defined"""
-        assert AIGenerator.SYSTEM_PROMPT
-        assert "search_course_content" in AIGenerator.SYSTEM_PROMPT
-        assert "get_course_outline" in AIGenerator.SYSTEM_PROMPT
+        found = set(_REQUIRED_TOOLS_RE.findall(AIGenerator.SYSTEM_PROMPT))
+        assert found == {"search_course_content", "get_course_outline"}
 
 
-class TestAIGeneratorBasicResponse:
-    """Test basic response generation without tools"""
-
-    @patch("anthropic.Anthropic")
-    def test_generate_response_without_tools(self, mock_anthropic_class):
-        """Test generating a response without tool usage"""
-        # Setup mock
-        mock_client = Mock()
-        mock_response = Mock()
-        mock_response.content = [Mock(text="This is a response")]
-        mock_response.stop_reason = "end_turn"
-        mock_client.messages.create.return_value = mock_response
-        mock_anthropic_class.return_value = mock_client
+_HISTORY = [
+    {"role": "user", "content": "Previous question"},
+    {"role": "assistant", "content": "Previous answer"},
+]
+_SEARCH_TOOL_DEF = {
+    "name": "search_course_content",
+    "description": "Search for course content",
+    "input_schema": {
+        "type": "object",
+        "properties": {"query": {"type": "string"}},
+        "required": ["query"],
+    },
+}
 
-        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
-        generator.client = mock_client
 
-        # Generate response
-        result = generator.generate_response(query="What is 2+2?")
+def _check_history(call_kwargs):
+    """History leads the messages and the system prompt is left untouched"""
+    assert call_kwargs["system"] == AIGenerator.SYSTEM_BLOCKS
+    messages = call_kwargs["messages"]
+    assert [m["role"] for m in messages] == ["user", "assistant", "user"]
+    assert messages[0] == _HISTORY[0]
+    assert messages[-1] == {"role": "user", "content": "Follow-up question"}
 
-        # Verify
-        assert result["response"] == "This is a response"
-        assert result["rounds_used"] == 0  # No tool rounds for direct answer
-        assert result["tools_used"] == []
-        mock_client.messages.create.assert_called_once()
 
-    @patch("anthropic.Anthropic")
-    def test_generate_response_with_conversation_history(self, mock_anthropic_class):
-        """Test generating response with conversation history"""
-        # Setup mock
-        mock_client = Mock()
-        mock_response = Mock()
-        mock_response.content = [Mock(text="Response with history")]
-        mock_response.stop_reason = "end_turn"
-        mock_client.messages.create.return_value = mock_response
-        mock_anthropic_class.return_value = mock_client
+def _check_tools(call_kwargs):
+    """Tools and tool_choice are passed to the API"""
+    assert [t["name"] for t in call_kwargs["tools"]] == ["search_course_content"]
+    assert "tool_choice" in call_kwargs
 
-        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
-        generator.client = mock_client
 
-        # Generate response with history
-        history = "User: Previous question\nAssistant: Previous answer"
-        result = generator.generate_response(
-            query="Follow-up question", conversation_history=history
-        )
+class TestAIGeneratorBasicResponse:
+    """Test direct responses that finish without a tool round"""
+
+    @pytest.mark.parametrize(
+        "kwargs, check",
+        [
+            pytest.param({"query": "What is 2+2?"}, None, id="plain"),
+            pytest.param(
+                {"query": "Follow-up question", "conversation_history": _HISTORY},
+                _check_history,
+                id="with_history",
+            ),
+            pytest.param(
+                {"query": "What is MCP?", "tools": [_SEARCH_TOOL_DEF]},
+                _check_tools,
+                id="with_tools",
+            ),
+        ],
+    )
+    async def test_generate_response(self, kwargs, check):
+        """Test a single API call whose text answer is returned as-is"""
+        mock_client = make_client()
+        mock_client.messages.create.return_value = make_text_response("This is a response")
+
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514", client=mock_client)
+        result = await generator.generate_response(**kwargs)
 
-        # Verify result format
-        assert result["response"] == "Response with history"
-        assert result["rounds_used"] == 0
+        assert result["response"] == "This is a response"
+        assert result["rounds_used"] == 0  # No tool rounds for direct answer
         assert result["tools_used"] == []
-
-        # Verify system prompt includes history
-        call_args = mock_client.messages.create.call_args
-        assert history in call_args.kwargs["system"]
+        mock_client.messages.create.assert_called_once()
+        if check is not None:
+            check(mock_client.messages.create.call_args.kwargs)
+
+
+# Search results returned by the mock vector store; CourseSearchTool only reads them
+_MCP_RESULTS = SearchResults(
+    documents=["MCP is a protocol for AI"],
+    metadata=[{"course_title": "MCP Course"}],
+    distances=[0.1],
+)
+_INTRO_MCP_RESULTS = SearchResults(
+    documents=["MCP stands for Model Context Protocol. It enables AI applications to..."],
+    metadata=[
+        {
+            "course_title": "Introduction to MCP",
+            "lesson_number": 0,
+            "lesson_link": "https://example.com/lesson-0",
+        }
+    ],
+    distances=[0.05],
+)
 
 
 class TestAIGeneratorToolCalling:
     """Test tool calling functionality"""
 
-    @patch("anthropic.Anthropic")
-    def test_generate_response_with_tools_provided(self, mock_anthropic_class):
-        """Test that tools are passed to the API when provided"""
-        # Setup mock
-        mock_client = Mock()
-        mock_response = Mock()
-        mock_response.content = [Mock(text="Response")]
-        mock_response.stop_reason = "end_turn"
-        mock_client.messages.create.return_value = mock_response
-        mock_anthropic_class.return_value = mock_client
-
-        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
-        generator.client = mock_client
-
-        # Create tool definitions
-        tools = [
-            {
-                "name": "search_course_content",
-                "description": "Search for course content",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {"query": {"type": "string"}},
-                    "required": ["query"],
-                },
-            }
-        ]
-
-        # Generate response with tools
-        result = generator.generate_response(query="What is MCP?", tools=tools)
-
-        # Verify result format
-        assert result["response"] == "Response"
-        assert result["rounds_used"] == 0
-        assert result["tools_used"] == []
-
-        # Verify tools were passed to API
-        call_args = mock_client.messages.create.call_args
-        assert "tools" in call_args.kwargs
-        assert call_args.kwargs["tools"] == tools
-        assert "tool_choice" in call_args.kwargs
-
-    @patch("anthropic.Anthropic")
-    def test_tool_execution_flow(self, mock_anthropic_class):
+    async def test_tool_execution_flow(self, tool_manager):
         """
         CRITICAL TEST: Verify that tool execution flow works correctly.
         This tests the complete flow: Claude requests tool -> tool executes -> results sent back
         """
         # Setup mock client
-        mock_client = Mock()
+        mock_client = make_client()
 
         # First response: Claude wants to use a tool
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "tool_123"
-        mock_tool_block.input = {"query": "What is MCP?"}
-        mock_tool_response.content = [mock_tool_block]
+        mock_tool_response = make_tool_use_response(
+            make_tool_use("search_course_content", "tool_123", {"query": "What is MCP?"})
+        )
 
         # Second response: Final answer after tool use
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="MCP stands for Model Context Protocol")]
-        mock_final_response.stop_reason = "end_turn"
+        mock_final_response = make_text_response("MCP stands for Model Context Protocol")
 
         # Configure mock to return different responses
         mock_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
-        mock_anthropic_class.return_value = mock_client
 
-        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
-        generator.client = mock_client
-
-        # Create tool manager with mock search tool
-        mock_vector_store = Mock()
-        mock_vector_store.search.return_value = SearchResults(
-            documents=["MCP is a protocol for AI"],
-            metadata=[{"course_title": "MCP Course"}],
-            distances=[0.1],
-        )
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514", client=mock_client)
 
-        tool_manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vector_store)
-        tool_manager.register_tool(search_tool)
+        # Point the shared search tool's mock vector store at a result
+        mock_vector_store = tool_manager.tools["search_course_content"].store
+        mock_vector_store.search.return_value = _MCP_RESULTS
 
         # Generate response with tool
-        result = generator.generate_response(
+        result = await generator.generate_response(
             query="What is MCP?",
             tools=tool_manager.get_tool_definitions(),
             tool_manager=tool_manager,
@@ -199,39 +240,33 @@ class TestAIGeneratorToolCalling:
         assert result["tools_used"] == ["search_course_content"]
         assert mock_client.messages.create.call_count == 2  # Initial call + follow-up
 
-    @patch("anthropic.Anthropic")
-    def test_tool_execution_calls_tool_manager(self, mock_anthropic_class):
+    async def test_tool_execution_calls_tool_manager(self):
         """Test that tool execution properly calls the tool manager"""
         # Setup mocks
-        mock_client = Mock()
+        mock_client = make_client()
 
         # Tool use response
-        mock_tool_response = Mock()
-        mock_tool_response.stop_reason = "tool_use"
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "tool_123"
-        mock_tool_block.input = {"query": "test query", "course_name": "Test Course"}
-        mock_tool_response.content = [mock_tool_block]
+        mock_tool_response = make_tool_use_response(
+            make_tool_use(
+                "search_course_content",
+                "tool_123",
+                {"query": "test query", "course_name": "Test Course"},
+            )
+        )
 
         # Final response
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Final answer")]
-        mock_final_response.stop_reason = "end_turn"
+        mock_final_response = make_text_response("Final answer")
 
-        mock_client.messages.create.side_effect = [mock_tool_response, mock_final_response]
-        mock_anthropic_class.return_value = mock_client
+        # No call assertions on the client, so replay the responses without a Mock
+        mock_client.messages.create = scripted(mock_tool_response, mock_final_response)
 
-        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
-        generator.client = mock_client
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514", client=mock_client)
 
         # Create mock tool manager
-        mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.return_value = "Tool result"
+        mock_tool_manager = make_tool_manager("Tool result")
 
         # Generate response
-        result = generator.generate_response(
+        result = await generator.generate_response(
             query="What is MCP?",
             tools=[{"name": "search_course_content"}],
             tool_manager=mock_tool_manager,
@@ -243,163 +278,193 @@ class TestAIGeneratorToolCalling:
         assert result["tools_used"] == ["search_course_content"]
 
         # Verify tool manager was called with correct parameters
-        mock_tool_manager.execute_tool.assert_called_once_with(
-            "search_course_content", query="test query", course_name="Test Course"
-        )
+        assert mock_tool_manager.execute_tool.calls == [
+            (("search_course_content",), {"query": "test query", "course_name": "Test Course"})
+        ]
 
 
-class TestAIGeneratorToolExecutionHandler:
-    """Test the _handle_tool_execution method"""
+class TestAIGeneratorPromptCaching:
+    """Test prompt-cache breakpoints on the system prompt and tool definitions"""
 
-    @patch("anthropic.Anthropic")
-    def test_handle_tool_execution_builds_messages_correctly(self, mock_anthropic_class):
-        """Test that tool execution handler builds message history correctly"""
-        mock_client = Mock()
+    async def test_system_block_has_cache_control(self):
+        """Test that the static system prompt is sent as a cached block"""
+        mock_client = make_client()
+        mock_response = make_text_response("Response")
+        mock_client.messages.create.return_value = mock_response
 
-        # Final response after tool use
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Final answer")]
-        mock_final_response.stop_reason = "end_turn"
-        mock_client.messages.create.return_value = mock_final_response
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514", client=mock_client)
 
-        mock_anthropic_class.return_value = mock_client
+        await generator.generate_response(query="What is MCP?")
 
-        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
-        generator.client = mock_client
-
-        # Create initial response with tool use
-        mock_initial_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "tool_123"
-        mock_tool_block.input = {"query": "test"}
-        mock_initial_response.content = [mock_tool_block]
-
-        # Create base params
-        base_params = {
-            "messages": [{"role": "user", "content": "What is MCP?"}],
-            "system": "You are a helpful assistant",
-        }
+        system_blocks = mock_client.messages.create.call_args.kwargs["system"]
+        assert len(system_blocks) == 1
+        assert system_blocks[0]["text"] == AIGenerator.SYSTEM_PROMPT
+        assert system_blocks[0]["cache_control"] == {"type": "ephemeral"}
 
-        # Create mock tool manager
-        mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.return_value = "Search results"
+    async def test_history_breakpoint_on_newest_prior_turn(self):
+        """Test that the newest prior turn carries a breakpoint and the new query does not"""
+        mock_client = make_client()
+        mock_response = make_text_response("Response")
+        mock_client.messages.create.return_value = mock_response
+
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514", client=mock_client)
+
+        history = [
+            {"role": "user", "content": "Hi"},
+            {"role": "assistant", "content": "Hello"},
+        ]
+        await generator.generate_response(query="Follow-up", conversation_history=history)
+
+        call_kwargs = mock_client.messages.create.call_args.kwargs
+        assert len(call_kwargs["system"]) == 1
+
+        messages = call_kwargs["messages"]
+        assert messages[0] == {"role": "user", "content": "Hi"}
+        assert messages[1]["content"][0]["text"] == "Hello"
+        assert messages[1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+        assert messages[2] == {"role": "user", "content": "Follow-up"}
+
+        # Session history passed in by the caller is left untouched
+        assert history[1] == {"role": "assistant", "content": "Hello"}
+
+    async def test_last_tool_has_cache_control(self):
+        """Test that only the last tool definition gets a breakpoint, without mutating input"""
+        mock_client = make_client()
+        mock_response = make_text_response("Response")
+        mock_client.messages.create.return_value = mock_response
+
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514", client=mock_client)
+
+        tools = [{"name": "search_course_content"}, {"name": "get_course_outline"}]
+        await generator.generate_response(query="What is MCP?", tools=tools)
+
+        sent_tools = mock_client.messages.create.call_args.kwargs["tools"]
+        assert "cache_control" not in sent_tools[0]
+        assert sent_tools[-1]["cache_control"] == {"type": "ephemeral"}
+
+        # Caller's tool definitions are left untouched
+        assert tools == [{"name": "search_course_content"}, {"name": "get_course_outline"}]
+
+
+class TestAIGeneratorResponseCache:
+    """Test exact-match caching of final answers"""
+
+    async def test_repeated_query_served_from_cache(self):
+        """Test that an identical request is answered from the cache without an API call"""
+        mock_client = make_client()
+        mock_response = make_text_response("MCP is a protocol")
+        mock_client.messages.create.return_value = mock_response
+
+        generator = AIGenerator(
+            "test_api_key",
+            "claude-sonnet-4-20250514",
+            response_cache=ResponseCache(":memory:"),
+            client=mock_client,
+        )
+
+        first = await generator.generate_response(query="What is MCP?")
+        second = await generator.generate_response(query="What is MCP?")
+
+        assert first["response"] == second["response"] == "MCP is a protocol"
+        assert mock_client.messages.create.call_count == 1
 
-        # Execute tool handling
-        result = generator._handle_tool_execution(
-            mock_initial_response, base_params, mock_tool_manager
+    async def test_different_history_misses_cache(self):
+        """Test that a change anywhere in the request produces a different cache key"""
+        mock_client = make_client()
+        mock_response = make_text_response("Answer")
+        mock_client.messages.create.return_value = mock_response
+
+        generator = AIGenerator(
+            "test_api_key",
+            "claude-sonnet-4-20250514",
+            response_cache=ResponseCache(":memory:"),
+            client=mock_client,
         )
 
-        # Verify final API call was made with correct message structure
-        call_args = mock_client.messages.create.call_args
-        messages = call_args.kwargs["messages"]
+        await generator.generate_response(query="Tell me more")
+        await generator.generate_response(
+            query="Tell me more",
+            conversation_history=[
+                {"role": "user", "content": "What is MCP?"},
+                {"role": "assistant", "content": "A protocol"},
+            ],
+        )
 
-        # Should have: original user message, assistant tool use, user tool result
-        assert len(messages) == 3
-        assert messages[0]["role"] == "user"
-        assert messages[1]["role"] == "assistant"
-        assert messages[2]["role"] == "user"
+        assert mock_client.messages.create.call_count == 2
 
-    @patch("anthropic.Anthropic")
-    def test_handle_tool_execution_without_tools_in_final_call(self, mock_anthropic_class):
-        """Test that final API call after tool execution does NOT include tools parameter"""
-        mock_client = Mock()
+    async def test_tool_use_responses_are_not_cached(self):
+        """Test that intermediate tool_use responses always go to the API"""
+        mock_client = make_client()
 
-        mock_final_response = Mock()
-        mock_final_response.content = [Mock(text="Final answer")]
-        mock_final_response.stop_reason = "end_turn"
-        mock_client.messages.create.return_value = mock_final_response
+        tool_response = make_tool_use_response(
+            make_tool_use("search_course_content", "tool_1", {"query": "MCP"})
+        )
 
-        mock_anthropic_class.return_value = mock_client
+        mock_client.messages.create.return_value = tool_response
 
-        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
-        generator.client = mock_client
-
-        # Create initial response
-        mock_initial_response = Mock()
-        mock_tool_block = Mock()
-        mock_tool_block.type = "tool_use"
-        mock_tool_block.name = "search_course_content"
-        mock_tool_block.id = "tool_123"
-        mock_tool_block.input = {"query": "test"}
-        mock_initial_response.content = [mock_tool_block]
-
-        base_params = {
-            "messages": [{"role": "user", "content": "What is MCP?"}],
-            "system": "You are a helpful assistant",
-        }
+        cache = ResponseCache(":memory:")
+        generator = AIGenerator(
+            "test_api_key", "claude-sonnet-4-20250514", response_cache=cache, client=mock_client
+        )
 
-        mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.return_value = "Results"
+        mock_tool_manager = make_tool_manager("Results")
 
-        # Execute
-        result = generator._handle_tool_execution(
-            mock_initial_response, base_params, mock_tool_manager
+        await generator.generate_response(
+            query="What is MCP?",
+            tools=[{"name": "search_course_content"}],
+            tool_manager=mock_tool_manager,
         )
 
-        # Verify final call does NOT have 'tools' parameter
-        call_args = mock_client.messages.create.call_args
-        assert "tools" not in call_args.kwargs
+        row_count = cache.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        assert row_count == 0
+
+    def test_build_key_is_order_independent(self):
+        """Test that dict key order does not affect the cache key"""
+        key_a = ResponseCache.build_key({"model": "m", "messages": [{"role": "user"}]})
+        key_b = ResponseCache.build_key({"messages": [{"role": "user"}], "model": "m"})
 
+        assert key_a == key_b
 
+
+@pytest.mark.integration
+@pytest.mark.slow
 class TestAIGeneratorIntegration:
     """Integration tests with real tool manager"""
 
-    @patch("anthropic.Anthropic")
-    def test_full_tool_calling_flow(self, mock_anthropic_class):
+    async def test_full_tool_calling_flow(self, tool_manager):
         """
         Integration test: Full flow from query to tool execution to final answer.
         This simulates what happens when a user asks a content-related question.
         """
         # Setup mock Claude responses
-        mock_client = Mock()
+        mock_client = make_client()
 
         # Response 1: Claude decides to use search tool
-        tool_use_response = Mock()
-        tool_use_response.stop_reason = "tool_use"
-        tool_block = Mock()
-        tool_block.type = "tool_use"
-        tool_block.name = "search_course_content"
-        tool_block.id = "tool_use_1"
-        tool_block.input = {"query": "What is MCP?", "course_name": "Introduction to MCP"}
-        tool_use_response.content = [tool_block]
+        tool_use_response = make_tool_use_response(
+            make_tool_use(
+                "search_course_content",
+                "tool_use_1",
+                {"query": "What is MCP?", "course_name": "Introduction to MCP"},
+            )
+        )
 
         # Response 2: Claude gives final answer after seeing search results
-        final_response = Mock()
-        final_response.content = [
-            Mock(text="Based on the course materials, MCP stands for Model Context Protocol.")
-        ]
-        final_response.stop_reason = "end_turn"
+        final_response = make_text_response(
+            "Based on the course materials, MCP stands for Model Context Protocol."
+        )
 
         mock_client.messages.create.side_effect = [tool_use_response, final_response]
-        mock_anthropic_class.return_value = mock_client
 
         # Setup AI generator
-        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
-        generator.client = mock_client
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514", client=mock_client)
 
-        # Setup tool manager with mock vector store
-        mock_vector_store = Mock()
+        # Setup the shared search tool's mock vector store
+        mock_vector_store = tool_manager.tools["search_course_content"].store
         mock_vector_store._resolve_course_name.return_value = "Introduction to MCP"
-        mock_vector_store.search.return_value = SearchResults(
-            documents=["MCP stands for Model Context Protocol. It enables AI applications to..."],
-            metadata=[
-                {
-                    "course_title": "Introduction to MCP",
-                    "lesson_number": 0,
-                    "lesson_link": "https://example.com/lesson-0",
-                }
-            ],
-            distances=[0.05],
-        )
-
-        tool_manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vector_store)
-        tool_manager.register_tool(search_tool)
+        mock_vector_store.search.return_value = _INTRO_MCP_RESULTS
 
         # Execute query
-        result = generator.generate_response(
+        result = await generator.generate_response(
             query="What is MCP in the Introduction to MCP course?",
             tools=tool_manager.get_tool_definitions(),
             tool_manager=tool_manager,
@@ -414,308 +479,529 @@ class TestAIGeneratorIntegration:
         # Verify search was called
         mock_vector_store.search.assert_called_once()
 
-        # Verify sources are tracked
-        sources = tool_manager.get_last_sources()
-        assert len(sources) > 0
+        # Verify sources are returned with the result
+        assert len(result["sources"]) > 0
+
+    @staticmethod
+    def _search_course(course_name):
+        return make_tool_use_response(
+            make_tool_use(
+                "search_course_content", "tool_1", {"query": "intro", "course_name": course_name}
+            )
+        )
+
+    async def test_unknown_course_is_answered(self, tool_manager):
+        """Test a search naming no known course is a normal tool result Claude answers from"""
+        client = FakeAnthropic(
+            self._search_course("Foo"), make_text_response("There is no course named Foo.")
+        )
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514", client=client)
+        store = tool_manager.tools["search_course_content"].store
+        store.search.return_value = SearchResults.no_match("No course found matching 'Foo'")
+
+        result = await generator.generate_response(
+            query="What is in the Foo course?",
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        assert result["response"] == "There is no course named Foo."
+        assert result["rounds_used"] == 1
+        assert result["succeeded"] is True
+        (tool_result,) = client.calls[1]["messages"][-1]["content"]
+        assert tool_result["content"] == "No course found matching 'Foo'"
+        assert "is_error" not in tool_result
+
+    async def test_failed_search_is_reported_to_claude(self, tool_manager):
+        """Test a broken search is sent to Claude as an is_error result and Claude still answers"""
+        client = FakeAnthropic(
+            self._search_course("MCP"), make_text_response("Search is unavailable right now.")
+        )
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514", client=client)
+        store = tool_manager.tools["search_course_content"].store
+        store.search.return_value = SearchResults.empty("Search error: connection failed")
+
+        result = await generator.generate_response(
+            query="What is MCP?",
+            tools=tool_manager.get_tool_definitions(),
+            tool_manager=tool_manager,
+        )
+
+        assert result["response"] == "Search is unavailable right now."
+        assert result["succeeded"] is False
+        assert len(client.calls) == 2
+        (tool_result,) = client.calls[1]["messages"][-1]["content"]
+        assert tool_result["is_error"] is True
+        assert tool_result["content"] == "Search error: connection failed"
+
+
+Scenario = namedtuple(
+    "Scenario",
+    "name responses tool_error history expected_rounds expected_tools expected_text "
+    "message_counts",
+)
+
+MULTI_ROUND_SCENARIOS = [
+    Scenario(
+        name="two_sequential_tool_calls",
+        responses=[
+            make_tool_use_response(
+                make_tool_use("search_course_content", "tool_1", {"query": "MCP basics"})
+            ),
+            make_tool_use_response(
+                make_tool_use("get_course_outline", "tool_2", {"course_name": "MCP Course"})
+            ),
+            make_text_response("Here's what I found about MCP"),
+        ],
+        tool_error=None,
+        history=None,
+        expected_rounds=2,
+        expected_tools=["search_course_content", "get_course_outline"],
+        expected_text="Here's what I found about MCP",
+        message_counts=[1, 3, 5],
+    ),
+    Scenario(
+        name="max_rounds_enforcement",
+        responses=[
+            make_tool_use_response(
+                make_tool_use("search_course_content", "tool_1", {"query": "test"})
+            ),
+            make_tool_use_response(
+                make_tool_use("search_course_content", "tool_2", {"query": "test2"})
+            ),
+            make_text_response("Final answer after max rounds"),
+        ],
+        tool_error=None,
+        history=None,
+        expected_rounds=2,
+        expected_tools=["search_course_content", "search_course_content"],
+        expected_text="Final answer after max rounds",
+        message_counts=[1, 3, 5],
+    ),
+    Scenario(
+        # The is_error result goes back to Claude in one final call, which answers from it
+        name="tool_execution_error_gets_final_answer",
+        responses=[
+            make_tool_use_response(
+                make_tool_use("search_course_content", "tool_1", {"query": "test"})
+            ),
+            make_text_response("The search is unavailable right now."),
+        ],
+        tool_error=Exception("Tool failed"),
+        history=None,
+        expected_rounds=1,
+        expected_tools=["search_course_content"],
+        expected_text="The search is unavailable right now.",
+        message_counts=[1, 3],
+    ),
+    Scenario(
+        name="single_tool_round",
+        responses=[
+            make_tool_use_response(
+                make_tool_use("search_course_content", "tool_1", {"query": "test"})
+            ),
+            make_text_response("Final answer"),
+        ],
+        tool_error=None,
+        history=None,
+        expected_rounds=1,
+        expected_tools=["search_course_content"],
+        expected_text="Final answer",
+        message_counts=[1, 3],
+    ),
+    Scenario(
+        name="conversation_history_preserved",
+        responses=[
+            make_tool_use_response(
+                make_tool_use("search_course_content", "tool_1", {"query": "test"})
+            ),
+            make_text_response("Final answer"),
+        ],
+        tool_error=None,
+        history=_HISTORY,
+        expected_rounds=1,
+        expected_tools=["search_course_content"],
+        expected_text="Final answer",
+        message_counts=[3, 5],
+    ),
+]
 
 
 class TestMultiRoundToolCalling:
     """Test multi-round sequential tool calling functionality"""
 
-    @patch("anthropic.Anthropic")
-    def test_two_sequential_tool_calls(self, mock_anthropic_class):
-        """Test Claude can make 2 separate tool calls across 2 rounds"""
-        mock_client = Mock()
-
-        # Round 1: First tool use
-        round1_response = Mock()
-        round1_response.stop_reason = "tool_use"
-        tool_block_1 = Mock()
-        tool_block_1.type = "tool_use"
-        tool_block_1.name = "search_course_content"
-        tool_block_1.id = "tool_1"
-        tool_block_1.input = {"query": "MCP basics"}
-        round1_response.content = [tool_block_1]
-
-        # Round 2: Second tool use after first tool results
-        round2_response = Mock()
-        round2_response.stop_reason = "tool_use"
-        tool_block_2 = Mock()
-        tool_block_2.type = "tool_use"
-        tool_block_2.name = "get_course_outline"
-        tool_block_2.id = "tool_2"
-        tool_block_2.input = {"course_name": "MCP Course"}
-        round2_response.content = [tool_block_2]
-
-        # Final response after both tools
-        final_response = Mock()
-
-        # Create a simple object with text attribute instead of Mock
-        class TextBlock:
-            text = "Here's what I found about MCP"
-
-        final_response.content = [TextBlock()]
-        final_response.stop_reason = "end_turn"
-
-        mock_client.messages.create.side_effect = [round1_response, round2_response, final_response]
-        mock_anthropic_class.return_value = mock_client
+    @pytest.mark.parametrize("scenario", MULTI_ROUND_SCENARIOS, ids=lambda s: s.name)
+    async def test_multi_round_tool_calling(self, scenario):
+        """Test rounds, tool names, final text and per-call request shape for each scenario"""
+        responses = iter(scenario.responses)
+        captured_calls = []
 
-        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
-        generator.client = mock_client
+        async def capture_and_respond(**kwargs):
+            # The generator keeps appending to the same messages list, so snapshot only
+            # the roles; earlier entries are never rewritten and can be read afterwards
+            captured_calls.append({**kwargs, "roles": [msg["role"] for msg in kwargs["messages"]]})
+            return next(responses)
+
+        mock_client = make_client()
+        mock_client.messages.create = capture_and_respond
 
-        # Mock tool manager
-        mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.return_value = "Tool results"
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514", client=mock_client)
 
-        # Execute
-        result = generator.generate_response(
-            query="Tell me about MCP",
+        mock_tool_manager = make_tool_manager("Tool results", side_effect=scenario.tool_error)
+
+        result = await generator.generate_response(
+            query="Test query",
+            conversation_history=scenario.history,
             tools=[{"name": "search_course_content"}, {"name": "get_course_outline"}],
             tool_manager=mock_tool_manager,
         )
 
-        # Verify
-        assert result["response"] == "Here's what I found about MCP"
-        assert result["rounds_used"] == 2  # Two tool rounds
-        assert result["tools_used"] == ["search_course_content", "get_course_outline"]
-        assert mock_client.messages.create.call_count == 3  # 3 API calls total
-
-    @patch("anthropic.Anthropic")
-    def test_max_rounds_enforcement(self, mock_anthropic_class):
-        """Test system stops after 2 rounds even if Claude wants more"""
-        mock_client = Mock()
-
-        # Round 1: tool use
-        tool_response_1 = Mock()
-        tool_response_1.stop_reason = "tool_use"
-        tool_block_1 = Mock()
-        tool_block_1.type = "tool_use"
-        tool_block_1.name = "search_course_content"
-        tool_block_1.id = "tool_1"
-        tool_block_1.input = {"query": "test"}
-        tool_response_1.content = [tool_block_1]
-
-        # Round 2: tool use
-        tool_response_2 = Mock()
-        tool_response_2.stop_reason = "tool_use"
-        tool_block_2 = Mock()
-        tool_block_2.type = "tool_use"
-        tool_block_2.name = "search_course_content"
-        tool_block_2.id = "tool_2"
-        tool_block_2.input = {"query": "test2"}
-        tool_response_2.content = [tool_block_2]
-
-        # Final response after max rounds
-        final_response = Mock()
-
-        class TextBlock:
-            text = "Final answer after max rounds"
-
-        final_response.content = [TextBlock()]
-        final_response.stop_reason = "end_turn"
-
-        mock_client.messages.create.side_effect = [tool_response_1, tool_response_2, final_response]
-        mock_anthropic_class.return_value = mock_client
+        assert result["rounds_used"] == scenario.expected_rounds
+        assert result["tools_used"] == scenario.expected_tools
+        if scenario.expected_text is not None:
+            assert result["response"] == scenario.expected_text
+
+        # Each round adds an assistant tool_use turn and a user tool_result turn
+        assert [len(call["roles"]) for call in captured_calls] == scenario.message_counts
+
+        for call in captured_calls:
+            roles = call["roles"]
+            assert roles == ["user", "assistant"] * (len(roles) // 2) + ["user"]
+
+            # Tools are offered in every round
+            assert [t["name"] for t in call["tools"]] == [
+                "search_course_content",
+                "get_course_outline",
+            ]
+            assert "tool_choice" in call
+
+            # Conversation history leads the messages in every call
+            if scenario.history:
+                messages = call["messages"]
+                assert messages[0] == scenario.history[0]
+                assert messages[1]["content"][0]["text"] == scenario.history[1]["content"]
+
 
+class TestParallelToolExecution:
+    """Test concurrent execution of multiple tool_use blocks in one round"""
+
+    # Each round appends to the list it is given, so tests pass a fresh list(...) copy
+    OPENING_MESSAGES = ({"role": "user", "content": "q"},)
+
+    @staticmethod
+    def _tool_block(block_id, query):
+        return make_tool_use("search_course_content", block_id, {"query": query})
+
+    async def test_tool_results_preserve_block_order(self):
+        """Test tool_result entries line up with tool_use blocks even if tools finish out of order"""
         generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
-        generator.client = mock_client
 
-        mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.return_value = "Results"
+        response = make_tool_use_response(
+            self._tool_block("tool_1", "slow"), self._tool_block("tool_2", "fast")
+        )
 
-        # Execute
-        result = generator.generate_response(
-            query="Test query",
-            tools=[{"name": "search_course_content"}],
-            tool_manager=mock_tool_manager,
+        # "slow" waits until "fast" has finished, forcing out-of-order completion
+        # without a wall-clock sleep
+        fast_done = threading.Event()
+
+        def execute_tool(name, query):
+            if query == "slow":
+                assert fast_done.wait(timeout=2)
+            else:
+                fast_done.set()
+            return f"Results for {query}"
+
+        mock_tool_manager = make_tool_manager(side_effect=execute_tool)
+
+        messages, success, tool_names, had_tool_use, _ = await generator._execute_tools_for_round(
+            response, list(self.OPENING_MESSAGES), mock_tool_manager
         )
 
-        # Verify max rounds enforced
-        assert result["rounds_used"] == 2  # Stopped at max
-        assert mock_client.messages.create.call_count == 3  # 2 tool calls + 1 final call
-        assert len(result["tools_used"]) == 2
-        assert result["response"] == "Final answer after max rounds"
+        assert success is True
+        assert had_tool_use is True
+        assert tool_names == ["search_course_content", "search_course_content"]
+        tool_results = messages[-1]["content"]
+        assert [r["tool_use_id"] for r in tool_results] == ["tool_1", "tool_2"]
+        assert [r["content"] for r in tool_results] == ["Results for slow", "Results for fast"]
 
-    @patch("anthropic.Anthropic")
-    def test_tool_execution_error_terminates(self, mock_anthropic_class):
-        """Test that tool execution error prevents additional rounds"""
-        mock_client = Mock()
+    async def test_sources_follow_tool_use_order(self):
+        """Test each call's sources are returned in tool_use order, not completion order"""
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
 
-        # First response wants to use tool
-        tool_response = Mock()
-        tool_response.stop_reason = "tool_use"
-        tool_block = Mock()
-        tool_block.type = "tool_use"
-        tool_block.name = "search_course_content"
-        tool_block.id = "tool_1"
-        tool_block.input = {"query": "test"}
-        tool_response.content = [tool_block]
+        response = make_tool_use_response(
+            self._tool_block("tool_1", "slow"), self._tool_block("tool_2", "fast")
+        )
 
-        mock_client.messages.create.return_value = tool_response
-        mock_anthropic_class.return_value = mock_client
+        fast_done = threading.Event()
 
+        def execute_tool_with_sources(name, query):
+            if query == "slow":
+                assert fast_done.wait(timeout=2)
+            else:
+                fast_done.set()
+            return f"Results for {query}", [{"text": f"Source for {query}"}]
+
+        tool_manager = SimpleNamespace(execute_tool_with_sources=execute_tool_with_sources)
+
+        _, success, _, _, sources = await generator._execute_tools_for_round(
+            response, list(self.OPENING_MESSAGES), tool_manager
+        )
+
+        assert success is True
+        assert sources == [{"text": "Source for slow"}, {"text": "Source for fast"}]
+
+    async def test_tools_execute_concurrently(self):
+        """Test that tools in the same round run at the same time rather than sequentially"""
         generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
-        generator.client = mock_client
 
-        # Tool manager that raises exception
-        mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.side_effect = Exception("Tool failed")
+        response = make_tool_use_response(
+            self._tool_block("tool_1", "a"), self._tool_block("tool_2", "b")
+        )
 
-        # Execute
-        result = generator.generate_response(
-            query="Test query",
-            tools=[{"name": "search_course_content"}],
-            tool_manager=mock_tool_manager,
+        # Both calls must be in flight together to pass the barrier
+        barrier = threading.Barrier(2, timeout=2)
+
+        def execute_tool(name, query):
+            barrier.wait()
+            return f"Results for {query}"
+
+        mock_tool_manager = make_tool_manager(side_effect=execute_tool)
+
+        messages, success, _, _, _ = await generator._execute_tools_for_round(
+            response, list(self.OPENING_MESSAGES), mock_tool_manager
         )
 
-        # Verify error terminated the loop
-        assert result["rounds_used"] == 0  # No successful rounds
-        assert mock_client.messages.create.call_count == 1  # Only initial call
-        assert result["tools_used"] == [
-            "search_course_content"
-        ]  # Tool name collected before execution
-
-    @patch("anthropic.Anthropic")
-    def test_message_history_preserved_across_rounds(self, mock_anthropic_class):
-        """Test messages accumulate correctly through rounds"""
-        mock_client = Mock()
-
-        # Capture message snapshots at each call
-        captured_messages = []
-
-        def capture_and_respond(**kwargs):
-            # Make a copy of messages to capture state at this point
-            captured_messages.append([msg.copy() for msg in kwargs.get("messages", [])])
-
-            # Return appropriate response based on call count
-            if len(captured_messages) == 1:
-                # Round 1 - return tool use
-                round1_response = Mock()
-                round1_response.stop_reason = "tool_use"
-                tool_block_1 = Mock()
-                tool_block_1.type = "tool_use"
-                tool_block_1.name = "search_course_content"
-                tool_block_1.id = "tool_1"
-                tool_block_1.input = {"query": "test"}
-                round1_response.content = [tool_block_1]
-                return round1_response
-            else:
-                # Round 2 - return final answer
-                round2_response = Mock()
-                text_block = Mock()
-                text_block.text = "Final answer"
-                round2_response.content = [text_block]
-                round2_response.stop_reason = "end_turn"
-                return round2_response
+        assert success is True
+        assert all("is_error" not in r for r in messages[-1]["content"])
 
-        mock_client.messages.create.side_effect = capture_and_respond
-        mock_anthropic_class.return_value = mock_client
+    async def test_one_failing_tool_marks_round_failed(self):
+        """Test that a failure in one concurrent tool is reported without dropping the others"""
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
+
+        response = make_tool_use_response(
+            self._tool_block("tool_1", "ok"), self._tool_block("tool_2", "boom")
+        )
 
+        def execute_tool(name, query):
+            if query == "boom":
+                raise RuntimeError("search backend down")
+            return "Results"
+
+        mock_tool_manager = make_tool_manager(side_effect=execute_tool)
+
+        messages, success, _, _, _ = await generator._execute_tools_for_round(
+            response, list(self.OPENING_MESSAGES), mock_tool_manager
+        )
+
+        assert success is False
+        ok_result, error_result = messages[-1]["content"]
+        assert ok_result["content"] == "Results"
+        assert error_result["is_error"] is True
+        assert "search backend down" in error_result["content"]
+
+    async def test_tool_error_is_reported_to_claude(self):
+        """Test that a ToolError fails the round and its message is sent as an is_error result"""
         generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
-        generator.client = mock_client
 
-        mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.return_value = "Tool results"
+        response = make_tool_use_response(self._tool_block("tool_1", "q"))
 
-        # Execute
-        result = generator.generate_response(
-            query="Test query",
-            tools=[{"name": "search_course_content"}],
-            tool_manager=mock_tool_manager,
+        mock_tool_manager = make_tool_manager(
+            side_effect=ToolError("Search error: connection failed")
+        )
+
+        messages, success, _, _, _ = await generator._execute_tools_for_round(
+            response, list(self.OPENING_MESSAGES), mock_tool_manager
         )
 
-        # Verify message history structure at each call
-        # First call should have: [user_message]
-        assert len(captured_messages[0]) == 1
-        assert captured_messages[0][0]["role"] == "user"
-
-        # Second call should have: [user_message, assistant_tool_use, user_tool_results]
-        assert len(captured_messages[1]) == 3
-        assert captured_messages[1][0]["role"] == "user"
-        assert captured_messages[1][1]["role"] == "assistant"
-        assert captured_messages[1][2]["role"] == "user"
-
-    @patch("anthropic.Anthropic")
-    def test_tools_parameter_present_in_all_rounds(self, mock_anthropic_class):
-        """Test that tools parameter is passed to API in every round"""
-        mock_client = Mock()
-
-        # Round 1
-        round1_response = Mock()
-        round1_response.stop_reason = "tool_use"
-        tool_block = Mock()
-        tool_block.type = "tool_use"
-        tool_block.name = "search_course_content"
-        tool_block.id = "tool_1"
-        tool_block.input = {"query": "test"}
-        round1_response.content = [tool_block]
-
-        # Round 2 (final)
-        round2_response = Mock()
-        round2_response.content = [Mock(text="Final answer")]
-        round2_response.stop_reason = "end_turn"
-
-        mock_client.messages.create.side_effect = [round1_response, round2_response]
-        mock_anthropic_class.return_value = mock_client
+        assert success is False
+        (error_result,) = messages[-1]["content"]
+        assert error_result["is_error"] is True
+        assert error_result["content"] == "Search error: connection failed"
 
+    async def test_result_mentioning_error_is_not_a_failure(self):
+        """Test that result text containing the word "Error" does not fail the round"""
         generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
-        generator.client = mock_client
 
-        mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.return_value = "Results"
+        response = make_tool_use_response(self._tool_block("tool_1", "q"))
 
-        tools_list = [{"name": "search_course_content"}]
+        mock_tool_manager = make_tool_manager("[Course - Lesson 3]\nError handling in MCP")
 
-        # Execute
-        result = generator.generate_response(
-            query="Test query", tools=tools_list, tool_manager=mock_tool_manager
+        messages, success, _, _, _ = await generator._execute_tools_for_round(
+            response, list(self.OPENING_MESSAGES), mock_tool_manager
         )
 
-        # Verify tools present in ALL API calls
-        for call in mock_client.messages.create.call_args_list:
-            assert "tools" in call.kwargs
-            assert call.kwargs["tools"] == tools_list
-            assert "tool_choice" in call.kwargs
+        assert success is True
+        assert "is_error" not in messages[-1]["content"][0]
 
-    @patch("anthropic.Anthropic")
-    def test_conversation_history_preserved_in_multi_round(self, mock_anthropic_class):
-        """Test conversation history is maintained across tool rounds"""
-        mock_client = Mock()
+    async def test_assistant_content_is_stored_as_plain_dicts(self):
+        """Test that SDK content blocks are dumped to dicts once when appended to messages"""
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
 
-        # Round 1
-        round1_response = Mock()
-        round1_response.stop_reason = "tool_use"
-        tool_block = Mock()
-        tool_block.type = "tool_use"
-        tool_block.name = "search_course_content"
-        tool_block.id = "tool_1"
-        tool_block.input = {"query": "test"}
-        round1_response.content = [tool_block]
+        response = make_tool_use_response(
+            TextBlock(type="text", text="Let me search"),
+            ToolUseBlock(type="tool_use", id="tool_1", name="search_course_content", input={}),
+        )
 
-        # Final response
-        final_response = Mock()
-        final_response.content = [Mock(text="Final answer")]
-        final_response.stop_reason = "end_turn"
+        mock_tool_manager = make_tool_manager("Results")
 
-        mock_client.messages.create.side_effect = [round1_response, final_response]
-        mock_anthropic_class.return_value = mock_client
+        messages, _, _, _, _ = await generator._execute_tools_for_round(
+            response, list(self.OPENING_MESSAGES), mock_tool_manager
+        )
 
+        assert messages[1]["content"] == [
+            {"type": "text", "text": "Let me search"},
+            {"type": "tool_use", "id": "tool_1", "name": "search_course_content", "input": {}},
+        ]
+
+    async def test_response_without_tool_use_blocks(self):
+        """Test that a round with no tool_use blocks reports it and runs nothing"""
         generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514")
-        generator.client = mock_client
 
-        mock_tool_manager = Mock()
-        mock_tool_manager.execute_tool.return_value = "Results"
+        response = make_text_response("No tools needed")
 
-        conversation_history = "User: Previous question\nAssistant: Previous answer"
+        mock_tool_manager = make_tool_manager()
 
-        # Execute
-        result = generator.generate_response(
-            query="Follow-up question",
-            conversation_history=conversation_history,
-            tools=[{"name": "search_course_content"}],
-            tool_manager=mock_tool_manager,
+        messages, success, tool_names, had_tool_use, _ = await generator._execute_tools_for_round(
+            response, list(self.OPENING_MESSAGES), mock_tool_manager
+        )
+
+        assert had_tool_use is False
+        assert tool_names == []
+        assert mock_tool_manager.execute_tool.calls == []
+
+
+class FakeMessageStream:
+    """Minimal stand-in for the SDK's MessageStream async context manager"""
+
+    def __init__(self, final_message, text_deltas=()):
+        self.final_message = final_message
+        self.text_deltas = list(text_deltas)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    @property
+    async def text_stream(self):
+        for text in self.text_deltas:
+            yield text
+
+    async def get_final_message(self):
+        return self.final_message
+
+
+class TestAIGeneratorStreaming:
+    """Test generate_response_stream"""
+
+    @staticmethod
+    async def _collect(stream):
+        return [event async for event in stream]
+
+    async def test_stream_yields_text_then_done(self):
+        """Test text deltas are yielded in order, followed by a done event"""
+        final = make_text_response("MCP is a protocol")
+
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514", client=make_client())
+        generator.client.messages.stream.return_value = FakeMessageStream(
+            final, ["MCP is ", "a protocol"]
+        )
+
+        events = await self._collect(generator.generate_response_stream(query="What is MCP?"))
+
+        assert events[:-1] == [
+            {"type": "text", "text": "MCP is "},
+            {"type": "text", "text": "a protocol"},
+        ]
+        assert events[-1] == {
+            "type": "done",
+            "response": "MCP is a protocol",
+            "rounds_used": 0,
+            "tools_used": [],
+            "sources": [],
+            "succeeded": True,
+        }
+
+    async def test_stream_runs_tool_rounds_before_final_answer(self):
+        """Test tool_use rounds execute tools and the follow-up call is streamed"""
+        tool_message = make_tool_use_response(
+            make_tool_use("search_course_content", "tool_1", {"query": "MCP"})
+        )
+
+        final = make_text_response("Found it")
+
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514", client=make_client())
+        generator.client.messages.stream.side_effect = [
+            FakeMessageStream(tool_message),
+            FakeMessageStream(final, ["Found it"]),
+        ]
+
+        mock_tool_manager = make_tool_manager("Results")
+
+        events = await self._collect(
+            generator.generate_response_stream(
+                query="What is MCP?",
+                tools=[{"name": "search_course_content"}],
+                tool_manager=mock_tool_manager,
+            )
         )
 
-        # Verify conversation history in system prompt for all calls
-        for call in mock_client.messages.create.call_args_list:
-            assert conversation_history in call.kwargs["system"]
+        assert [e["text"] for e in events if e["type"] == "text"] == ["Found it"]
+        assert events[-1]["rounds_used"] == 1
+        assert events[-1]["tools_used"] == ["search_course_content"]
+        assert mock_tool_manager.execute_tool.calls == [
+            (("search_course_content",), {"query": "MCP"})
+        ]
+
+        # Follow-up call carries the tool results
+        followup_messages = generator.client.messages.stream.call_args_list[1].kwargs["messages"]
+        assert followup_messages[-1]["content"][0]["tool_use_id"] == "tool_1"
+
+    async def test_stream_failed_tool_gets_one_final_call(self):
+        """Test a failed tool round is streamed back to Claude once, with no further tool round"""
+        tool_message = make_tool_use_response(
+            make_tool_use("search_course_content", "tool_1", {"query": "MCP"})
+        )
+
+        generator = AIGenerator("test_api_key", "claude-sonnet-4-20250514", client=make_client())
+        # Claude asks for tools again after the error; the generator must stop there
+        generator.client.messages.stream.side_effect = [
+            FakeMessageStream(tool_message),
+            FakeMessageStream(tool_message, ["Search failed"]),
+        ]
+
+        mock_tool_manager = make_tool_manager(side_effect=ToolError("Search error: down"))
+
+        events = await self._collect(
+            generator.generate_response_stream(
+                query="What is MCP?",
+                tools=[{"name": "search_course_content"}],
+                tool_manager=mock_tool_manager,
+            )
+        )
+
+        assert [e["text"] for e in events if e["type"] == "text"] == ["Search failed"]
+        assert events[-1]["succeeded"] is False
+        assert len(mock_tool_manager.execute_tool.calls) == 1
+        followup_messages = generator.client.messages.stream.call_args_list[1].kwargs["messages"]
+        assert followup_messages[-1]["content"][0]["is_error"] is True
+
+    async def test_stream_serves_cached_answer(self):
+        """Test a cached final answer is yielded without opening a stream"""
+        final = make_text_response("Cached answer")
+
+        generator = AIGenerator(
+            "test_api_key",
+            "claude-sonnet-4-20250514",
+            response_cache=ResponseCache(":memory:"),
+            client=make_client(),
+        )
+        generator.client.messages.stream.return_value = FakeMessageStream(final, ["Cached answer"])
+
+        await self._collect(generator.generate_response_stream(query="What is MCP?"))
+        events = await self._collect(generator.generate_response_stream(query="What is MCP?"))
+
+        assert events[0] == {"type": "text", "text": "Cached answer"}
+        assert events[-1]["response"] == "Cached answer"
+        assert generator.client.messages.stream.call_count == 1
@@ -5,13 +5,7 @@ These tests ensure all configuration values are properly set and valid.
 This will catch the MAX_RESULTS=0 bug immediately.
 """
 
-import sys
-from pathlib import Path
-
 import pytest
-
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from config import config
 
 
@@ -82,19 +76,17 @@ class TestConfigValidation:
 class TestConfigRecommendations:
     """Tests for recommended configuration values"""
 
-    def test_recommended_max_results(self):
-        """Test that MAX_RESULTS is set to a recommended value"""
-        recommended_range = range(3, 11)  # 3-10 is a good range
-        assert (
-            config.MAX_RESULTS in recommended_range
-        ), f"Recommended MAX_RESULTS is between 3-10, got {config.MAX_RESULTS}"
-
-    def test_recommended_chunk_size(self):
-        """Test that CHUNK_SIZE is set to a recommended value"""
-        recommended_range = range(500, 1501)  # 500-1500 is typical
-        assert (
-            config.CHUNK_SIZE in recommended_range
-        ), f"Recommended CHUNK_SIZE is between 500-1500, got {config.CHUNK_SIZE}"
+    @pytest.mark.parametrize(
+        "attr, low, high",
+        [
+            ("MAX_RESULTS", 3, 10),  # 3-10 is a good range
+            ("CHUNK_SIZE", 500, 1500),  # 500-1500 is typical
+        ],
+    )
+    def test_recommended_value(self, attr, low, high):
+        """Test that a setting is within its recommended range"""
+        value = getattr(config, attr)
+        assert low <= value <= high, f"Recommended {attr} is between {low}-{high}, got {value}"
 
     def test_recommended_chunk_overlap(self):
         """Test that CHUNK_OVERLAP is a reasonable percentage of CHUNK_SIZE"""
@@ -0,0 +1,68 @@
+"""
+Tests for DocumentProcessor
+
+These tests verify that course documents are parsed into:
+- Course metadata from the header lines
+- Lessons with their titles and links
+- Chunks tagged with lesson context
+"""
+
+import pytest
+from document_processor import DocumentProcessor
+
+COURSE_DOCUMENT = """Course Title: Test Course
+Course Link: https://example.com/test
+Course Instructor: Test Instructor
+
+Lesson 0: Introduction
+Lesson Link: https://example.com/lesson-0
+This is the introduction. It covers the basics.
+
+  lesson 1:  Advanced Topics
+This lesson covers advanced topics.
+Lesson 2:
+Still part of lesson 1.
+"""
+
+
+@pytest.fixture
+def parsed(tmp_path):
+    course_file = tmp_path / "course.txt"
+    course_file.write_text(COURSE_DOCUMENT)
+    return DocumentProcessor(chunk_size=800, chunk_overlap=0).process_course_document(
+        str(course_file)
+    )
+
+
+class TestProcessCourseDocument:
+    """Test parsing of the course document format"""
+
+    def test_course_metadata(self, parsed):
+        """Test title, link and instructor come from the header lines"""
+        course, _ = parsed
+
+        assert course.title == "Test Course"
+        assert course.course_link == "https://example.com/test"
+        assert course.instructor == "Test Instructor"
+
+    def test_lessons(self, parsed):
+        """Test markers are matched case-insensitively and a blank title is not a marker"""
+        course, _ = parsed
+
+        assert [
+            (lesson.lesson_number, lesson.title, lesson.lesson_link) for lesson in course.lessons
+        ] == [
+            (0, "Introduction", "https://example.com/lesson-0"),
+            (1, "Advanced Topics", None),
+        ]
+
+    def test_chunks_carry_lesson_context(self, parsed):
+        """Test the lesson link line is dropped and the last lesson is prefixed with the course"""
+        _, chunks = parsed
+
+        assert [chunk.content for chunk in chunks] == [
+            "Lesson 0 content: This is the introduction. It covers the basics.",
+            "Course Test Course Lesson 1 content: This lesson covers advanced topics. "
+            "Lesson 2: Still part of lesson 1.",
+        ]
+        assert [chunk.chunk_index for chunk in chunks] == [0, 1]
@@ -0,0 +1,60 @@
+"""
+Tests for EmbeddingCache
+
+These tests verify that the cache:
+- Only sends texts it has not seen to the embedding function
+- Keeps embeddings from different models apart
+- Returns embeddings in the order of the requested texts
+"""
+
+import numpy as np
+from embedding_cache import EmbeddingCache
+
+
+class FakeEmbedder:
+    """Embeds each text as [len(text), call number] and records what it was asked for"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), float(len(self.calls))] for text in texts]
+
+
+class TestEmbeddingCache:
+    """Test lookups and misses"""
+
+    def test_only_uncached_texts_are_embedded(self):
+        """Test a second call embeds just the new text and reuses the stored vectors"""
+        cache = EmbeddingCache(":memory:")
+        embedder = FakeEmbedder()
+
+        first = cache.embed(["alpha", "beta"], "model", embedder)
+        second = cache.embed(["beta", "gamma", "alpha"], "model", embedder)
+
+        assert embedder.calls == [["alpha", "beta"], ["gamma"]]
+        np.testing.assert_array_equal(second[0], first[1])
+        np.testing.assert_array_equal(second[2], first[0])
+        np.testing.assert_array_equal(second[1], [5.0, 2.0])
+
+    def test_models_are_cached_separately(self):
+        """Test the same text embedded with another model is a miss"""
+        cache = EmbeddingCache(":memory:")
+        embedder = FakeEmbedder()
+
+        cache.embed(["alpha"], "model-a", embedder)
+        cache.embed(["alpha"], "model-b", embedder)
+
+        assert embedder.calls == [["alpha"], ["alpha"]]
+
+    def test_clear_removes_embeddings(self):
+        """Test texts are embedded again after the cache is cleared"""
+        cache = EmbeddingCache(":memory:")
+        embedder = FakeEmbedder()
+
+        cache.embed(["alpha"], "model", embedder)
+        cache.clear()
+        cache.embed(["alpha"], "model", embedder)
+
+        assert len(embedder.calls) == 2
@@ -9,25 +9,26 @@ These tests verify that:
 - ToolManager properly manages tools
 """
 
-import sys
-from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import MagicMock, Mock
 
 import pytest
+from search_tools import CourseOutlineTool, CourseSearchTool, ToolError, ToolManager
+from vector_store import SearchResults
 
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
-from vector_store import SearchResults
+@pytest.fixture(scope="class")
+def search_tool_definition():
+    """CourseSearchTool's tool definition, built once; it doesn't depend on the store"""
+    return CourseSearchTool(Mock()).get_tool_definition()
 
 
 class TestCourseSearchToolDefinition:
     """Test CourseSearchTool tool definition"""
 
-    def test_get_tool_definition(self, mock_vector_store):
+    def test_get_tool_definition(self, search_tool_definition):
         """Test that tool definition is properly formatted for Anthropic"""
-        tool = CourseSearchTool(mock_vector_store)
-        definition = tool.get_tool_definition()
+        definition = search_tool_definition
 
         assert definition["name"] == "search_course_content"
         assert "description" in definition
@@ -36,10 +37,9 @@ class TestCourseSearchToolDefinition:
         assert "query" in definition["input_schema"]["properties"]
         assert "query" in definition["input_schema"]["required"]
 
-    def test_tool_definition_has_optional_params(self, mock_vector_store):
+    def test_tool_definition_has_optional_params(self, search_tool_definition):
         """Test that tool definition includes optional course_name and lesson_number"""
-        tool = CourseSearchTool(mock_vector_store)
-        definition = tool.get_tool_definition()
+        definition = search_tool_definition
 
         properties = definition["input_schema"]["properties"]
         assert "course_name" in properties
@@ -54,60 +54,32 @@ class TestCourseSearchToolDefinition:
 class TestCourseSearchToolExecution:
     """Test CourseSearchTool.execute() method"""
 
-    def test_execute_basic_query(self, mock_vector_store, sample_search_results):
-        """Test executing a basic search query"""
+    @pytest.mark.parametrize(
+        "filters",
+        [
+            {},
+            {"course_name": "Introduction to MCP"},
+            {"lesson_number": 1},
+            {"course_name": "Introduction to MCP", "lesson_number": 1},
+        ],
+        ids=["no_filters", "course_filter", "lesson_filter", "all_filters"],
+    )
+    def test_execute_forwards_filters(self, mock_vector_store, sample_search_results, filters):
+        """Test execute passes the query and any course/lesson filters on to the vector store"""
         mock_vector_store.search.return_value = sample_search_results
 
         tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute(query="What is MCP?")
+        result = tool.execute(query="What is MCP?", **filters)
 
-        # Verify search was called
+        # Filters that were not given are passed as None
         mock_vector_store.search.assert_called_once_with(
-            query="What is MCP?", course_name=None, lesson_number=None
+            query="What is MCP?",
+            course_name=filters.get("course_name"),
+            lesson_number=filters.get("lesson_number"),
         )
-
-        # Verify result is a string
         assert isinstance(result, str)
         assert len(result) > 0
 
-    def test_execute_with_course_filter(self, mock_vector_store, sample_search_results):
-        """Test executing search with course name filter"""
-        mock_vector_store.search.return_value = sample_search_results
-
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute(query="What is MCP?", course_name="Introduction to MCP")
-
-        # Verify search was called with course filter
-        mock_vector_store.search.assert_called_once_with(
-            query="What is MCP?", course_name="Introduction to MCP", lesson_number=None
-        )
-
-    def test_execute_with_lesson_filter(self, mock_vector_store, sample_search_results):
-        """Test executing search with lesson number filter"""
-        mock_vector_store.search.return_value = sample_search_results
-
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute(query="What is MCP?", lesson_number=1)
-
-        # Verify search was called with lesson filter
-        mock_vector_store.search.assert_called_once_with(
-            query="What is MCP?", course_name=None, lesson_number=1
-        )
-
-    def test_execute_with_all_filters(self, mock_vector_store, sample_search_results):
-        """Test executing search with both course and lesson filters"""
-        mock_vector_store.search.return_value = sample_search_results
-
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute(
-            query="What is MCP?", course_name="Introduction to MCP", lesson_number=1
-        )
-
-        # Verify search was called with both filters
-        mock_vector_store.search.assert_called_once_with(
-            query="What is MCP?", course_name="Introduction to MCP", lesson_number=1
-        )
-
     def test_execute_handles_empty_results(self, mock_vector_store, empty_search_results):
         """Test that execute handles empty search results properly"""
         mock_vector_store.search.return_value = empty_search_results
@@ -119,16 +91,26 @@ class TestCourseSearchToolExecution:
         assert "No relevant content found" in result
 
     def test_execute_handles_search_error(self, mock_vector_store):
-        """Test that execute handles search errors properly"""
+        """Test that execute raises ToolError when the search fails"""
         error_results = SearchResults.empty("Search error: connection failed")
 
         mock_vector_store.search.return_value = error_results
 
         tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute(query="What is MCP?")
+        with pytest.raises(ToolError, match="Search error"):
+            tool.execute(query="What is MCP?")
 
-        assert isinstance(result, str)
-        assert "Search error" in result
+    def test_execute_returns_unknown_course_message(self, mock_vector_store):
+        """Test that no matching course is returned as the result, not raised as a failure"""
+        mock_vector_store.search.return_value = SearchResults.no_match(
+            "No course found matching 'Foo'"
+        )
+
+        tool = CourseSearchTool(mock_vector_store)
+        result = tool.execute(query="What is MCP?", course_name="Foo")
+
+        assert result == "No course found matching 'Foo'"
+        assert tool.last_sources == []
 
     def test_execute_empty_results_includes_filter_info(
         self, mock_vector_store, empty_search_results
@@ -144,87 +126,65 @@ class TestCourseSearchToolExecution:
         assert "lesson 5" in result or "5" in result
 
 
+@pytest.fixture(scope="class")
+def executed_search(sample_search_results):
+    """
+    Run one CourseSearchTool search over the sample results for a whole test class.
+
+    Returns the formatted result plus last_sources before and after the search.
+    """
+    store = Mock()
+    store.search.return_value = sample_search_results
+
+    tool = CourseSearchTool(store)
+    sources_before = list(tool.last_sources)
+    result = tool.execute(query="What is MCP?")
+    return SimpleNamespace(result=result, sources_before=sources_before, sources=tool.last_sources)
+
+
 class TestCourseSearchToolFormatting:
     """Test result formatting in CourseSearchTool"""
 
-    def test_format_results_includes_course_context(self, mock_vector_store, sample_search_results):
+    def test_format_results_includes_course_context(self, executed_search):
         """Test that formatted results include course and lesson context"""
-        mock_vector_store.search.return_value = sample_search_results
-
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute(query="What is MCP?")
-
         # Should include course title in brackets
-        assert "[Introduction to MCP" in result
+        assert "[Introduction to MCP" in executed_search.result
 
-    def test_format_results_includes_lesson_numbers(self, mock_vector_store, sample_search_results):
+    def test_format_results_includes_lesson_numbers(self, executed_search):
         """Test that formatted results include lesson numbers"""
-        mock_vector_store.search.return_value = sample_search_results
-
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute(query="What is MCP?")
-
-        # Should include lesson numbers
-        assert "Lesson" in result
+        assert "Lesson" in executed_search.result
 
-    def test_format_results_includes_document_content(
-        self, mock_vector_store, sample_search_results
-    ):
+    def test_format_results_includes_document_content(self, executed_search):
         """Test that formatted results include actual document content"""
-        mock_vector_store.search.return_value = sample_search_results
-
-        tool = CourseSearchTool(mock_vector_store)
-        result = tool.execute(query="What is MCP?")
-
         # Should include at least one document's content
-        assert "MCP" in result
-        assert len(result) > 50  # Should have substantial content
+        assert "MCP" in executed_search.result
+        assert len(executed_search.result) > 50  # Should have substantial content
 
 
 class TestCourseSearchToolSourceTracking:
     """Test source tracking in CourseSearchTool"""
 
-    def test_last_sources_populated_after_search(self, mock_vector_store, sample_search_results):
+    def test_last_sources_populated_after_search(self, executed_search, sample_search_results):
         """
         CRITICAL TEST: Verify that last_sources is populated after search.
         This is needed for the frontend to display sources.
         """
-        mock_vector_store.search.return_value = sample_search_results
-
-        tool = CourseSearchTool(mock_vector_store)
-        assert len(tool.last_sources) == 0  # Should start empty
-
-        tool.execute(query="What is MCP?")
-
-        # Should now have sources
-        assert len(tool.last_sources) > 0
-        assert len(tool.last_sources) == len(sample_search_results.documents)
+        assert executed_search.sources_before == []  # Should start empty
+        assert len(executed_search.sources) == len(sample_search_results.documents)
 
-    def test_last_sources_format(self, mock_vector_store, sample_search_results):
+    def test_last_sources_format(self, executed_search):
         """Test that last_sources has correct format (list of dicts with text and optional link)"""
-        mock_vector_store.search.return_value = sample_search_results
-
-        tool = CourseSearchTool(mock_vector_store)
-        tool.execute(query="What is MCP?")
-
-        # Each source should be a dict
-        for source in tool.last_sources:
+        for source in executed_search.sources:
             assert isinstance(source, dict)
             assert "text" in source
             # link is optional
             if "link" in source:
                 assert isinstance(source["link"], str)
 
-    def test_last_sources_includes_lesson_links(self, mock_vector_store, sample_search_results):
+    def test_last_sources_includes_lesson_links(self, executed_search):
         """Test that sources include lesson links when available"""
-        mock_vector_store.search.return_value = sample_search_results
-
-        tool = CourseSearchTool(mock_vector_store)
-        tool.execute(query="What is MCP?")
-
         # At least one source should have a link (from our sample data)
-        has_link = any("link" in source for source in tool.last_sources)
-        assert has_link
+        assert any("link" in source for source in executed_search.sources)
 
     def test_last_sources_empty_for_no_results(self, mock_vector_store, empty_search_results):
         """Test that last_sources is empty when no results found"""
@@ -250,19 +210,11 @@ class TestCourseOutlineTool:
         assert "course_name" in definition["input_schema"]["properties"]
         assert "course_name" in definition["input_schema"]["required"]
 
-    def test_execute_returns_course_outline(self, mock_vector_store):
+    def test_execute_returns_course_outline(self, mock_vector_store, outline_catalog_response):
         """Test executing outline tool returns formatted course info"""
         # Mock the vector store methods
         mock_vector_store._resolve_course_name.return_value = "Introduction to MCP"
-        mock_vector_store.course_catalog.get.return_value = {
-            "metadatas": [
-                {
-                    "course_link": "https://example.com/mcp",
-                    "instructor": "Alex Smith",
-                    "lessons_json": '[{"lesson_number": 0, "lesson_title": "Getting Started", "lesson_link": "https://example.com/lesson-0"}]',
-                }
-            ]
-        }
+        mock_vector_store.course_catalog.get.return_value = outline_catalog_response
 
         tool = CourseOutlineTool(mock_vector_store)
         result = tool.execute(course_name="MCP")
@@ -282,6 +234,16 @@ class TestCourseOutlineTool:
         assert "No course found" in result
 
 
+@pytest.fixture(scope="module")
+def registered_manager():
+    """A ToolManager with both course tools registered, shared by tests that only read from it"""
+    store = Mock()
+    manager = ToolManager()
+    manager.register_tool(CourseSearchTool(store))
+    manager.register_tool(CourseOutlineTool(store))
+    return manager
+
+
 class TestToolManager:
     """Test ToolManager class"""
 
@@ -294,33 +256,32 @@ class TestToolManager:
 
         assert "search_course_content" in manager.tools
 
-    def test_register_multiple_tools(self, mock_vector_store):
+    def test_register_multiple_tools(self, registered_manager):
         """Test registering multiple tools"""
-        manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vector_store)
-        outline_tool = CourseOutlineTool(mock_vector_store)
+        assert len(registered_manager.tools) == 2
+        assert "search_course_content" in registered_manager.tools
+        assert "get_course_outline" in registered_manager.tools
 
-        manager.register_tool(search_tool)
-        manager.register_tool(outline_tool)
+    def test_get_tool_definitions(self, registered_manager):
+        """Test getting all tool definitions"""
+        definitions = registered_manager.get_tool_definitions()
 
-        assert len(manager.tools) == 2
-        assert "search_course_content" in manager.tools
-        assert "get_course_outline" in manager.tools
+        assert len(definitions) == 2
+        assert any(d["name"] == "search_course_content" for d in definitions)
+        assert any(d["name"] == "get_course_outline" for d in definitions)
 
-    def test_get_tool_definitions(self, mock_vector_store):
-        """Test getting all tool definitions"""
+    def test_get_tool_definitions_is_built_once(self, mock_vector_store):
+        """Test that definitions are reused until another tool is registered"""
         manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vector_store)
-        outline_tool = CourseOutlineTool(mock_vector_store)
+        manager.register_tool(CourseSearchTool(mock_vector_store))
 
-        manager.register_tool(search_tool)
-        manager.register_tool(outline_tool)
+        first = manager.get_tool_definitions()
+        assert manager.get_tool_definitions() is first
 
-        definitions = manager.get_tool_definitions()
+        manager.register_tool(CourseOutlineTool(mock_vector_store))
 
-        assert len(definitions) == 2
-        assert any(d["name"] == "search_course_content" for d in definitions)
-        assert any(d["name"] == "get_course_outline" for d in definitions)
+        names = [d["name"] for d in manager.get_tool_definitions()]
+        assert names == ["search_course_content", "get_course_outline"]
 
     def test_execute_tool(self, mock_vector_store, sample_search_results):
         """Test executing a tool by name"""
@@ -335,13 +296,10 @@ class TestToolManager:
         assert isinstance(result, str)
         assert len(result) > 0
 
-    def test_execute_nonexistent_tool(self, mock_vector_store):
-        """Test executing non-existent tool returns error"""
-        manager = ToolManager()
-
-        result = manager.execute_tool("nonexistent_tool", query="test")
-
-        assert "not found" in result
+    def test_execute_nonexistent_tool(self, registered_manager):
+        """Test executing non-existent tool raises ToolError"""
+        with pytest.raises(ToolError, match="not found"):
+            registered_manager.execute_tool("nonexistent_tool", query="test")
 
     def test_get_last_sources(self, mock_vector_store, sample_search_results):
         """Test getting last sources from tools"""
@@ -378,26 +336,23 @@ class TestToolManager:
 
 class TestSearchToolsIntegrationWithConfig:
     """
-    Integration tests that verify search tools work with actual config.
-    These will FAIL if config.MAX_RESULTS=0
+    Tests for what the search tools return when the store is configured with MAX_RESULTS=0.
+    The shipped MAX_RESULTS value itself is checked in test_config.py.
     """
 
-    def test_search_tool_with_zero_max_results(self, mock_vector_store):
+    def test_search_tool_with_zero_max_results(
+        self, fake_vector_store, sample_course, sample_course_chunks
+    ):
         """
         CRITICAL TEST: This demonstrates the bug when MAX_RESULTS=0
         """
-        from config import config
+        fake_vector_store.add_course_metadata(sample_course)
+        fake_vector_store.add_course_content(sample_course_chunks)
+        fake_vector_store.max_results = 0
 
-        # Simulate what happens when max_results=0
-        empty_results = SearchResults(documents=[], metadata=[], distances=[])
-        mock_vector_store.search.return_value = empty_results
-
-        tool = CourseSearchTool(mock_vector_store)
+        tool = CourseSearchTool(fake_vector_store)
         result = tool.execute(query="What is MCP?")
 
-        # With MAX_RESULTS=0, we get "No relevant content found"
-        if config.MAX_RESULTS == 0:
-            assert "No relevant content found" in result
-        else:
-            # If config is fixed, this test will pass differently
-            pass
+        # The store holds matching content, but MAX_RESULTS=0 asks it for none
+        assert result == "No relevant content found."
+        assert tool.last_sources == []
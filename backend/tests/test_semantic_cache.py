@@ -0,0 +1,52 @@
+"""
+Tests for SemanticCache
+
+These tests verify that the cache:
+- Serves answers for queries whose embeddings are similar enough
+- Misses below the similarity threshold
+- Expires entries after their TTL
+- Evicts the least recently used entry when full
+"""
+
+from unittest.mock import patch
+
+from semantic_cache import SemanticCache
+
+_SOURCES = [{"text": "MCP Course - Lesson 0", "link": None}]
+
+
+class TestSemanticCache:
+    """Test lookups, expiry and eviction"""
+
+    def test_similar_query_hits(self):
+        """Test an embedding close to a cached one returns its answer and sources"""
+        cache = SemanticCache(threshold=0.95)
+        cache.put([1.0, 0.0, 0.0], "MCP is a protocol", _SOURCES)
+
+        assert cache.get([0.99, 0.05, 0.0]) == ("MCP is a protocol", _SOURCES)
+
+    def test_dissimilar_query_misses(self):
+        """Test an embedding below the threshold is a miss"""
+        cache = SemanticCache(threshold=0.95)
+        cache.put([1.0, 0.0, 0.0], "MCP is a protocol", _SOURCES)
+
+        assert cache.get([0.6, 0.8, 0.0]) is None
+
+    def test_expired_entry_misses(self):
+        """Test entries are dropped once their TTL has passed"""
+        cache = SemanticCache(ttl=10.0)
+        with patch("semantic_cache.time.monotonic", return_value=100.0):
+            cache.put([1.0, 0.0], "answer", [])
+        with patch("semantic_cache.time.monotonic", return_value=111.0):
+            assert cache.get([1.0, 0.0]) is None
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test a full cache evicts the entry that was used least recently"""
+        cache = SemanticCache(maxsize=2)
+        cache.put([1.0, 0.0, 0.0], "first", [])
+        cache.put([0.0, 1.0, 0.0], "second", [])
+        cache.get([1.0, 0.0, 0.0])  # "first" is now the most recently used
+        cache.put([0.0, 0.0, 1.0], "third", [])
+
+        assert cache.get([0.0, 1.0, 0.0]) is None
+        assert cache.get([1.0, 0.0, 0.0]) == ("first", [])
@@ -8,44 +8,51 @@ These tests verify that the vector store correctly handles:
 - Filtering by course and lesson
 """
 
-import sys
-from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pytest
-
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
+from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
 from config import config
-from vector_store import SearchResults, VectorStore
+from vector_store import (
+    HNSW_CONFIGURATION,
+    ONNX_BACKEND,
+    SearchResults,
+    VectorStore,
+    get_embedding_function,
+)
 
 
+@pytest.mark.unit
 class TestSearchResults:
     """Test SearchResults dataclass"""
 
-    def test_from_chroma_with_results(self):
-        """Test creating SearchResults from ChromaDB response"""
+    @pytest.mark.parametrize(
+        "documents, metadatas, distances",
+        [
+            (
+                ["doc1", "doc2"],
+                [{"course_title": "Course 1"}, {"course_title": "Course 2"}],
+                [0.1, 0.2],
+            ),
+            ([], [], []),
+        ],
+        ids=["with_results", "empty"],
+    )
+    def test_from_chroma(self, documents, metadatas, distances):
+        """Test creating SearchResults from the first query's lists of a ChromaDB response"""
         chroma_results = {
-            "documents": [["doc1", "doc2"]],
-            "metadatas": [[{"course_title": "Course 1"}, {"course_title": "Course 2"}]],
-            "distances": [[0.1, 0.2]],
+            "documents": [documents],
+            "metadatas": [metadatas],
+            "distances": [distances],
         }
         results = SearchResults.from_chroma(chroma_results)
 
-        assert len(results.documents) == 2
-        assert results.documents[0] == "doc1"
-        assert len(results.metadata) == 2
-        assert results.metadata[0]["course_title"] == "Course 1"
+        assert results.documents == documents
+        assert results.metadata == metadatas
+        assert results.distances == distances
+        assert results.is_empty() == (not documents)
         assert results.error is None
 
-    def test_from_chroma_empty(self):
-        """Test creating SearchResults from empty ChromaDB response"""
-        chroma_results = {"documents": [[]], "metadatas": [[]], "distances": [[]]}
-        results = SearchResults.from_chroma(chroma_results)
-
-        assert len(results.documents) == 0
-        assert results.is_empty()
-
     def test_empty_with_error(self):
         """Test creating empty SearchResults with error message"""
         error_msg = "No course found"
@@ -54,10 +61,9 @@ class TestSearchResults:
         assert results.is_empty()
         assert results.error == error_msg
 
-    def test_is_empty(self):
+    def test_is_empty(self, empty_search_results):
         """Test is_empty method"""
-        empty = SearchResults(documents=[], metadata=[], distances=[])
-        assert empty.is_empty()
+        assert empty_search_results.is_empty()
 
         not_empty = SearchResults(documents=["doc"], metadata=[{}], distances=[0.1])
         assert not not_empty.is_empty()
@@ -65,108 +71,151 @@ class TestSearchResults:
 
 class TestVectorStoreWithConfig:
     """
-    Tests that verify VectorStore behavior with current config.
-    These tests will FAIL if MAX_RESULTS=0 in config.
+    Tests that verify VectorStore behavior for the settings it is built with.
+    The shipped MAX_RESULTS value itself is checked in test_config.py.
     """
 
-    def test_max_results_from_config(self, temp_chroma_path):
-        """
-        CRITICAL TEST: Verify that VectorStore uses config.MAX_RESULTS
-        This will FAIL if MAX_RESULTS=0
-        """
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, config.MAX_RESULTS)
-        assert store.max_results == config.MAX_RESULTS
-        assert store.max_results > 0, (
-            f"VectorStore max_results must be > 0, got {store.max_results}. "
-            f"This comes from config.MAX_RESULTS={config.MAX_RESULTS}"
+    @pytest.mark.chroma
+    @pytest.mark.parametrize("max_results", [0, 5])
+    def test_max_results_is_stored(self, temp_chroma_path, max_results):
+        """Test that VectorStore keeps the max_results it was built with"""
+        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results)
+
+        assert store.max_results == max_results
+
+    @pytest.mark.chroma
+    def test_stores_share_embedding_function(self, tmp_path):
+        """Test that stores using the same model reuse one embedding function"""
+        store_a = VectorStore(str(tmp_path / "a"), config.EMBEDDING_MODEL)
+        store_b = VectorStore(str(tmp_path / "b"), config.EMBEDDING_MODEL)
+
+        assert store_a.embedding_function is store_b.embedding_function
+
+    @pytest.mark.unit
+    def test_onnx_backend_uses_chroma_onnx_model(self):
+        """Test the onnx backend returns Chroma's ONNX Runtime MiniLM embedder"""
+        embedding_function = get_embedding_function("all-MiniLM-L6-v2", ONNX_BACKEND)
+
+        assert isinstance(embedding_function, ONNXMiniLM_L6_V2)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        "model_name, backend",
+        [("all-mpnet-base-v2", ONNX_BACKEND), ("all-MiniLM-L6-v2", "tensorflow")],
+    )
+    def test_unsupported_embedding_backend_raises(self, model_name, backend):
+        """Test unknown backends, and models the onnx backend has no export for, are rejected"""
+        with pytest.raises(ValueError):
+            get_embedding_function(model_name, backend)
+
+    @pytest.mark.chroma
+    def test_collections_use_hnsw_configuration(self, temp_chroma_path):
+        """Test both collections are created with the configured cosine HNSW index"""
+        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL)
+
+        for collection in (store.course_catalog, store.course_content):
+            hnsw = collection.configuration["hnsw"]
+            assert {key: hnsw[key] for key in HNSW_CONFIGURATION} == HNSW_CONFIGURATION
+
+    @pytest.mark.chroma
+    def test_rebuilds_collection_with_other_space(self, tmp_path):
+        """Test a collection created with l2 distances is rebuilt as cosine on startup"""
+        import chromadb
+        from chromadb.config import Settings
+
+        client = chromadb.PersistentClient(
+            path=str(tmp_path), settings=Settings(anonymized_telemetry=False)
+        )
+        old = client.create_collection(
+            "course_content",
+            embedding_function=get_embedding_function(config.EMBEDDING_MODEL),
+            configuration={"hnsw": {"space": "l2"}},
         )
+        old.add(documents=["stale"], embeddings=[[0.0] * 384], ids=["stale"])
 
-    def test_search_limit_with_config(self, temp_chroma_path, sample_course, sample_course_chunks):
+        store = VectorStore(str(tmp_path), config.EMBEDDING_MODEL)
+
+        assert store.course_content.configuration["hnsw"]["space"] == "cosine"
+        assert store.course_content.count() == 0
+
+    @pytest.mark.chroma
+    @pytest.mark.parametrize("max_results", [0, 5])
+    def test_search_uses_max_results(
+        self, tmp_path, embedding_cache, sample_course, sample_course_chunks, max_results
+    ):
         """
-        Test that search respects the configured MAX_RESULTS limit.
-        This will FAIL if MAX_RESULTS=0
+        Test that search without a limit returns at most max_results documents.
+        With max_results=0 it returns none, which is why MAX_RESULTS must be > 0.
         """
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, config.MAX_RESULTS)
-
-        # Add test data
+        store = VectorStore(
+            str(tmp_path), config.EMBEDDING_MODEL, max_results, embedding_cache=embedding_cache
+        )
         store.add_course_metadata(sample_course)
         store.add_course_content(sample_course_chunks)
 
-        # Search should use config.MAX_RESULTS
         results = store.search("MCP protocol")
 
-        # With MAX_RESULTS=0, this will fail
-        if config.MAX_RESULTS > 0:
-            assert (
-                len(results.documents) > 0
-            ), f"Expected search results with MAX_RESULTS={config.MAX_RESULTS}, got none"
-        else:
-            # This is the expected failure case
-            assert (
-                len(results.documents) == 0
-            ), f"With MAX_RESULTS=0, search should return 0 results"
+        assert len(results.documents) == min(max_results, len(sample_course_chunks))
 
 
 class TestVectorStoreAddOperations:
     """Test adding data to vector store"""
 
-    def test_add_course_metadata(self, temp_chroma_path, sample_course):
+    @pytest.mark.chroma
+    def test_add_course_metadata(self, vector_store, sample_course):
         """Test adding course metadata to catalog"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
+        store = vector_store
         store.add_course_metadata(sample_course)
 
         # Verify course was added
         course_titles = store.get_existing_course_titles()
         assert sample_course.title in course_titles
 
-    def test_add_course_content(self, temp_chroma_path, sample_course_chunks):
+    @pytest.mark.chroma
+    def test_add_course_content(self, vector_store, sample_course_chunks):
         """Test adding course content chunks"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
+        store = vector_store
         store.add_course_content(sample_course_chunks)
 
         # Verify content was added (check collection count)
         count = store.course_content.count()
         assert count == len(sample_course_chunks)
 
-    def test_add_empty_chunks(self, temp_chroma_path):
+    @pytest.mark.unit
+    def test_add_empty_chunks(self, fake_vector_store):
         """Test adding empty chunks list"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
+        store = fake_vector_store
         # Should not raise error
         store.add_course_content([])
 
-    def test_get_course_count(self, temp_chroma_path, sample_course):
+    @pytest.mark.unit
+    def test_get_course_count(self, fake_vector_store, sample_course):
         """Test getting course count"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
+        store = fake_vector_store
 
         assert store.get_course_count() == 0
         store.add_course_metadata(sample_course)
         assert store.get_course_count() == 1
 
 
+@pytest.mark.chroma
 class TestVectorStoreSearch:
     """Test search functionality with proper MAX_RESULTS"""
 
-    def test_search_with_results(self, temp_chroma_path, sample_course, sample_course_chunks):
-        """Test basic search returns results when max_results > 0"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
-
-        # Add data
-        store.add_course_metadata(sample_course)
-        store.add_course_content(sample_course_chunks)
+    @pytest.mark.benchmark(group="vector_store")
+    def test_search_with_results(self, benchmark, populated_vector_store, sample_course):
+        """Benchmark a basic search, which returns results when max_results > 0"""
+        store = populated_vector_store
 
-        # Search
-        results = store.search("What is MCP?")
+        results = benchmark(store.search, "What is MCP?")
 
         assert not results.is_empty(), "Search should return results when max_results=5"
         assert len(results.documents) > 0
         assert results.error is None
 
-    def test_search_with_course_filter(self, temp_chroma_path, sample_course, sample_course_chunks):
+    def test_search_with_course_filter(self, populated_vector_store, sample_course):
         """Test search with course name filter"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
-
-        store.add_course_metadata(sample_course)
-        store.add_course_content(sample_course_chunks)
+        store = populated_vector_store
 
         # Search with course filter
         results = store.search("MCP", course_name="Introduction to MCP")
@@ -176,12 +225,9 @@ class TestVectorStoreSearch:
         for meta in results.metadata:
             assert meta["course_title"] == sample_course.title
 
-    def test_search_with_lesson_filter(self, temp_chroma_path, sample_course, sample_course_chunks):
+    def test_search_with_lesson_filter(self, populated_vector_store, sample_course):
         """Test search with lesson number filter"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
-
-        store.add_course_metadata(sample_course)
-        store.add_course_content(sample_course_chunks)
+        store = populated_vector_store
 
         # Search with lesson filter
         results = store.search("MCP", course_name=sample_course.title, lesson_number=0)
@@ -190,21 +236,18 @@ class TestVectorStoreSearch:
         for meta in results.metadata:
             assert meta["lesson_number"] == 0
 
-    def test_search_nonexistent_course(self, temp_chroma_path):
+    def test_search_nonexistent_course(self, vector_store):
         """Test search for non-existent course returns error"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
+        store = vector_store
 
         results = store.search("test query", course_name="Nonexistent Course")
 
         assert results.error is not None
         assert "No course found" in results.error
 
-    def test_search_with_custom_limit(self, temp_chroma_path, sample_course, sample_course_chunks):
+    def test_search_with_custom_limit(self, populated_vector_store, sample_course):
         """Test search respects custom limit parameter"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
-
-        store.add_course_metadata(sample_course)
-        store.add_course_content(sample_course_chunks)
+        store = populated_vector_store
 
         # Search with custom limit
         results = store.search("MCP", limit=2)
@@ -215,58 +258,61 @@ class TestVectorStoreSearch:
 class TestVectorStoreCourseResolution:
     """Test course name resolution (fuzzy matching)"""
 
-    def test_resolve_exact_course_name(self, temp_chroma_path, sample_course):
+    @pytest.mark.chroma
+    def test_resolve_exact_course_name(self, populated_vector_store, sample_course):
         """Test resolving exact course name"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
-        store.add_course_metadata(sample_course)
+        store = populated_vector_store
 
         resolved = store._resolve_course_name(sample_course.title)
         assert resolved == sample_course.title
 
-    def test_resolve_partial_course_name(self, temp_chroma_path, sample_course):
-        """Test resolving partial course name (fuzzy match)"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
-        store.add_course_metadata(sample_course)
+    @pytest.mark.chroma
+    @pytest.mark.benchmark(group="vector_store")
+    def test_resolve_partial_course_name(self, benchmark, populated_vector_store, sample_course):
+        """Benchmark resolving a partial course name (fuzzy match)"""
+        store = populated_vector_store
 
         # Search with just "MCP"
-        resolved = store._resolve_course_name("MCP")
+        resolved = benchmark(store._resolve_course_name, "MCP")
         assert resolved == sample_course.title
 
-    def test_resolve_nonexistent_course(self, temp_chroma_path):
+    @pytest.mark.unit
+    def test_resolve_nonexistent_course(self, fake_vector_store):
         """Test resolving non-existent course returns None"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
+        store = fake_vector_store
 
         resolved = store._resolve_course_name("Nonexistent Course")
         assert resolved is None
 
 
+@pytest.mark.unit
 class TestVectorStoreFiltering:
     """Test filter building logic"""
 
-    def test_build_filter_no_params(self, temp_chroma_path):
+    def test_build_filter_no_params(self, fake_vector_store):
         """Test building filter with no parameters"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
+        store = fake_vector_store
 
         filter_dict = store._build_filter(None, None)
         assert filter_dict is None
 
-    def test_build_filter_course_only(self, temp_chroma_path):
+    def test_build_filter_course_only(self, fake_vector_store):
         """Test building filter with only course"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
+        store = fake_vector_store
 
         filter_dict = store._build_filter("Test Course", None)
         assert filter_dict == {"course_title": "Test Course"}
 
-    def test_build_filter_lesson_only(self, temp_chroma_path):
+    def test_build_filter_lesson_only(self, fake_vector_store):
         """Test building filter with only lesson"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
+        store = fake_vector_store
 
         filter_dict = store._build_filter(None, 1)
         assert filter_dict == {"lesson_number": 1}
 
-    def test_build_filter_both_params(self, temp_chroma_path):
+    def test_build_filter_both_params(self, fake_vector_store):
         """Test building filter with both course and lesson"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
+        store = fake_vector_store
 
         filter_dict = store._build_filter("Test Course", 1)
         assert "$and" in filter_dict
@@ -274,15 +320,13 @@ class TestVectorStoreFiltering:
         assert {"lesson_number": 1} in filter_dict["$and"]
 
 
+@pytest.mark.chroma
 class TestVectorStoreMetadataEnrichment:
     """Test lesson link enrichment in search results"""
 
-    def test_enrich_with_lesson_links(self, temp_chroma_path, sample_course, sample_course_chunks):
+    def test_enrich_with_lesson_links(self, populated_vector_store, sample_course):
         """Test that search results are enriched with lesson links"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
-
-        store.add_course_metadata(sample_course)
-        store.add_course_content(sample_course_chunks)
+        store = populated_vector_store
 
         results = store.search("MCP", course_name=sample_course.title)
 
@@ -292,29 +336,28 @@ class TestVectorStoreMetadataEnrichment:
                 # Should have lesson_link added
                 assert "lesson_link" in meta or meta.get("lesson_number") >= 0
 
-    def test_get_lesson_link(self, temp_chroma_path, sample_course):
+    def test_get_lesson_link(self, populated_vector_store, sample_course):
         """Test getting specific lesson link"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
-        store.add_course_metadata(sample_course)
+        store = populated_vector_store
 
         lesson_link = store.get_lesson_link(sample_course.title, 0)
         assert lesson_link == sample_course.lessons[0].lesson_link
 
-    def test_get_course_link(self, temp_chroma_path, sample_course):
+    def test_get_course_link(self, populated_vector_store, sample_course):
         """Test getting course link"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
-        store.add_course_metadata(sample_course)
+        store = populated_vector_store
 
         course_link = store.get_course_link(sample_course.title)
         assert course_link == sample_course.course_link
 
 
+@pytest.mark.chroma
 class TestVectorStoreClearOperations:
     """Test clearing data from vector store"""
 
-    def test_clear_all_data(self, temp_chroma_path, sample_course, sample_course_chunks):
+    def test_clear_all_data(self, vector_store, sample_course, sample_course_chunks):
         """Test clearing all data from collections"""
-        store = VectorStore(temp_chroma_path, config.EMBEDDING_MODEL, max_results=5)
+        store = vector_store
 
         # Add data
         store.add_course_metadata(sample_course)
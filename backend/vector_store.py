@@ -1,8 +1,8 @@
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
-import chromadb
-from chromadb.config import Settings
+from embedding_cache import EmbeddingCache
 from models import Course, CourseChunk
 
 
@@ -14,6 +14,9 @@ class SearchResults:
     metadata: List[Dict[str, Any]]
     distances: List[float]
     error: Optional[str] = None
+    # True when the search itself broke; False for errors that are an answer in
+    # their own right, such as no course matching the requested name
+    failed: bool = False
 
     @classmethod
     def from_chroma(cls, chroma_results: Dict) -> "SearchResults":
@@ -26,40 +29,121 @@ class SearchResults:
 
     @classmethod
     def empty(cls, error_msg: str) -> "SearchResults":
-        """Create empty results with error message"""
-        return cls(documents=[], metadata=[], distances=[], error=error_msg)
+        """Create empty results for a search that failed, with its error message"""
+        return cls(documents=[], metadata=[], distances=[], error=error_msg, failed=True)
+
+    @classmethod
+    def no_match(cls, message: str) -> "SearchResults":
+        """Create empty results explaining why nothing could be searched (not a failure)"""
+        return cls(documents=[], metadata=[], distances=[], error=message)
 
     def is_empty(self) -> bool:
         """Check if results are empty"""
         return len(self.documents) == 0
 
 
+# CHROMA_PATH value that selects an in-memory (ephemeral) ChromaDB client
+IN_MEMORY_PATH = ":memory:"
+
+# HNSW parameters for both collections. Chroma fixes these when a collection is
+# created; VectorStore rebuilds an existing collection whose distance space differs
+HNSW_CONFIGURATION = {
+    "space": "cosine",
+    "max_neighbors": 16,  # M
+    "ef_construction": 200,
+    "ef_search": 50,
+}
+
+# Embedding backends: PyTorch sentence transformers, or Chroma's bundled ONNX
+# Runtime export of all-MiniLM-L6-v2 (no torch at inference time)
+SENTENCE_TRANSFORMERS_BACKEND = "sentence-transformers"
+ONNX_BACKEND = "onnx"
+
+
+@lru_cache(maxsize=4)
+def get_embedding_function(model_name: str, backend: str = SENTENCE_TRANSFORMERS_BACKEND):
+    """
+    Return the embedding function for a model and backend, created once per process.
+
+    Every VectorStore built with the same model and backend shares one instance,
+    so the model weights are loaded at most once.
+    """
+    from chromadb.utils import embedding_functions
+
+    if backend == SENTENCE_TRANSFORMERS_BACKEND:
+        return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model_name)
+    if backend == ONNX_BACKEND:
+        if model_name != embedding_functions.ONNXMiniLM_L6_V2.MODEL_NAME:
+            raise ValueError(
+                f"The onnx embedding backend only supports all-MiniLM-L6-v2, not {model_name}"
+            )
+        return embedding_functions.ONNXMiniLM_L6_V2()
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
 class VectorStore:
     """Vector storage using ChromaDB for course content and metadata"""
 
-    def __init__(self, chroma_path: str, embedding_model: str, max_results: int = 5):
-        self.max_results = max_results
-        # Initialize ChromaDB client
-        self.client = chromadb.PersistentClient(
-            path=chroma_path, settings=Settings(anonymized_telemetry=False)
-        )
+    def __init__(
+        self,
+        chroma_path: str,
+        embedding_model: str,
+        max_results: int = 5,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        embedding_backend: str = SENTENCE_TRANSFORMERS_BACKEND,
+    ):
+        # chromadb takes a noticeable time to import, so modules that only need
+        # SearchResults (and mock-only tests) don't pay for it at import time
+        import chromadb
+        from chromadb.config import Settings
 
-        # Set up sentence transformer embedding function
-        self.embedding_function = (
-            chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction(
-                model_name=embedding_model
-            )
-        )
+        self.max_results = max_results
+        # Initialize ChromaDB client; ":memory:" keeps everything in RAM. In-memory
+        # clients share one store per process, so use it for one store at a time
+        settings = Settings(anonymized_telemetry=False)
+        if chroma_path == IN_MEMORY_PATH:
+            self.client = chromadb.EphemeralClient(settings=settings)
+        else:
+            self.client = chromadb.PersistentClient(path=chroma_path, settings=settings)
+
+        # Set up the embedding function (shared per model name and backend)
+        self.embedding_model = embedding_model
+        self.embedding_backend = embedding_backend
+        self.embedding_function = get_embedding_function(embedding_model, embedding_backend)
+        # Documents already embedded once (e.g. re-ingested files) skip the model
+        self.embedding_cache = embedding_cache
 
         # Create collections for different types of data
         self.course_catalog = self._create_collection("course_catalog")  # Course titles/instructors
         self.course_content = self._create_collection("course_content")  # Actual course material
 
+    def embed_query(self, text: str):
+        """Embed a single query with the same model the collections use"""
+        return self.embedding_function([text])[0]
+
     def _create_collection(self, name: str):
-        """Create or get a ChromaDB collection"""
-        return self.client.get_or_create_collection(
-            name=name, embedding_function=self.embedding_function
+        """Create or get a ChromaDB collection, rebuilding one indexed in another space"""
+        collection = self.client.get_or_create_collection(
+            name=name,
+            embedding_function=self.embedding_function,
+            configuration={"hnsw": HNSW_CONFIGURATION},
         )
+        # An existing collection keeps the space it was created with, and its distances
+        # mean something else (e.g. l2 from before cosine). Chroma cannot change it in
+        # place, so drop the collection; startup reloads the documents it held
+        space = (collection.configuration.get("hnsw") or {}).get("space")
+        if space != HNSW_CONFIGURATION["space"]:
+            print(
+                f"Rebuilding collection {name}: its HNSW space is {space}, "
+                f"not {HNSW_CONFIGURATION['space']}"
+            )
+            self.client.delete_collection(name)
+            collection = self.client.create_collection(
+                name=name,
+                embedding_function=self.embedding_function,
+                configuration={"hnsw": HNSW_CONFIGURATION},
+            )
+        return collection
 
     def search(
         self,
@@ -85,7 +169,7 @@ class VectorStore:
         if course_name:
             course_title = self._resolve_course_name(course_name)
             if not course_title:
-                return SearchResults.empty(f"No course found matching '{course_name}'")
+                return SearchResults.no_match(f"No course found matching '{course_name}'")
 
         # Step 2: Build filter for content search
         filter_dict = self._build_filter(course_title, lesson_number)
@@ -150,24 +234,39 @@ class VectorStore:
 
     def add_course_metadata(self, course: Course):
         """Add course information to the catalog for semantic search"""
-        import json
+        self._add_catalog_entries([course])
 
-        course_text = course.title
+    def add_courses(self, courses: List[Tuple[Course, List[CourseChunk]]]):
+        """
+        Add several courses and their content chunks at once.
 
-        # Build lessons metadata and serialize as JSON string
-        lessons_metadata = []
-        for lesson in course.lessons:
-            lessons_metadata.append(
-                {
-                    "lesson_number": lesson.lesson_number,
-                    "lesson_title": lesson.title,
-                    "lesson_link": lesson.lesson_link,
-                }
-            )
+        Each collection gets its documents in as few add() calls as possible, so
+        the embedding model encodes them in batches instead of once per course.
+        """
+        if not courses:
+            return
 
-        self.course_catalog.add(
-            documents=[course_text],
-            metadatas=[
+        self._add_catalog_entries([course for course, _ in courses])
+        self.add_course_content([chunk for _, chunks in courses for chunk in chunks])
+
+    def _add_catalog_entries(self, courses: List[Course]):
+        """Add catalog entries (title document plus course metadata) for the given courses"""
+        import json
+
+        metadatas = []
+        for course in courses:
+            # Build lessons metadata and serialize as JSON string
+            lessons_metadata = []
+            for lesson in course.lessons:
+                lessons_metadata.append(
+                    {
+                        "lesson_number": lesson.lesson_number,
+                        "lesson_title": lesson.title,
+                        "lesson_link": lesson.lesson_link,
+                    }
+                )
+
+            metadatas.append(
                 {
                     "title": course.title,
                     "instructor": course.instructor,
@@ -175,9 +274,10 @@ class VectorStore:
                     "lessons_json": json.dumps(lessons_metadata),  # Serialize as JSON string
                     "lesson_count": len(course.lessons),
                 }
-            ],
-            ids=[course.title],
-        )
+            )
+
+        titles = [course.title for course in courses]
+        self._add_in_batches(self.course_catalog, documents=titles, metadatas=metadatas, ids=titles)
 
     def add_course_content(self, chunks: List[CourseChunk]):
         """Add course content chunks to the vector store"""
@@ -196,7 +296,28 @@ class VectorStore:
         # Use title with chunk index for unique IDs
         ids = [f"{chunk.course_title.replace(' ', '_')}_{chunk.chunk_index}" for chunk in chunks]
 
-        self.course_content.add(documents=documents, metadatas=metadatas, ids=ids)
+        self._add_in_batches(self.course_content, documents=documents, metadatas=metadatas, ids=ids)
+
+    def _add_in_batches(
+        self, collection, documents: List[str], metadatas: List[Dict], ids: List[str]
+    ):
+        """Add records to a collection, split only where ChromaDB's batch size limit requires it"""
+        batch_size = self.client.get_max_batch_size()
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            embeddings = None
+            if self.embedding_cache is not None:
+                embeddings = self.embedding_cache.embed(
+                    documents[start:end],
+                    f"{self.embedding_backend}/{self.embedding_model}",
+                    self.embedding_function,
+                )
+            collection.add(
+                documents=documents[start:end],
+                embeddings=embeddings,
+                metadatas=metadatas[start:end],
+                ids=ids[start:end],
+            )
 
     def clear_all_data(self):
         """Clear all data from both collections"""
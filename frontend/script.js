@@ -76,8 +76,10 @@ async function sendMessage() {
     chatMessages.appendChild(loadingMessage);
     chatMessages.scrollTop = chatMessages.scrollHeight;
 
+    let streamingMessage = null;
+
     try {
-        const response = await fetch(`${API_URL}/query`, {
+        const response = await fetch(`${API_URL}/query/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -90,23 +92,57 @@ async function sendMessage() {
 
         if (!response.ok) throw new Error('Query failed');
 
-        const data = await response.json();
-
-        // Debug: log the sources structure
-        console.log('Received sources:', data.sources);
-
-        // Update session ID if new
-        if (!currentSessionId) {
-            currentSessionId = data.session_id;
+        // Read Server-Sent Events and render the answer as it streams in
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let answer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const frames = buffer.split('\n\n');
+            buffer = frames.pop();
+
+            for (const frame of frames) {
+                if (!frame.startsWith('data: ')) continue;
+                const data = JSON.parse(frame.slice(6));
+
+                if (data.type === 'text') {
+                    // Replace loading message with the streaming response on first text
+                    if (!streamingMessage) {
+                        loadingMessage.remove();
+                        const messageId = addMessage('', 'assistant');
+                        streamingMessage = document.getElementById(`message-${messageId}`);
+                    }
+                    answer += data.text;
+                    streamingMessage.querySelector('.message-content').innerHTML = marked.parse(answer);
+                    chatMessages.scrollTop = chatMessages.scrollHeight;
+                } else if (data.type === 'done') {
+                    // Debug: log the sources structure
+                    console.log('Received sources:', data.sources);
+
+                    // Update session ID if new
+                    if (!currentSessionId) {
+                        currentSessionId = data.session_id;
+                    }
+
+                    // Re-render the final answer with its sources
+                    loadingMessage.remove();
+                    if (streamingMessage) streamingMessage.remove();
+                    addMessage(data.answer, 'assistant', data.sources);
+                } else if (data.type === 'error') {
+                    throw new Error(data.detail);
+                }
+            }
         }
 
-        // Replace loading message with response
-        loadingMessage.remove();
-        addMessage(data.answer, 'assistant', data.sources);
-
     } catch (error) {
-        // Replace loading message with error
+        // Replace loading (or partial) message with error
         loadingMessage.remove();
+        if (streamingMessage) streamingMessage.remove();
         addMessage(`Error: ${error.message}`, 'assistant');
     } finally {
         chatInput.disabled = false;
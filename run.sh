@@ -12,5 +12,9 @@ fi
 echo "Starting Course Materials RAG System..."
 echo "Make sure you have set your ANTHROPIC_API_KEY in .env"
 
+# The resource tracker runs in its own process, so its leaked-semaphore
+# notice can only be silenced through the environment
+export PYTHONWARNINGS="ignore:resource_tracker:UserWarning"
+
 # Change to backend directory and start the server
 cd backend && uv run uvicorn app:app --reload --port 8000
\ No newline at end of file